@@ -6,6 +6,64 @@ import time
 from typing import Any, Optional
 
 
+class FakePipeline:
+    """
+    Mock redis-py pipeline that buffers commands and replays them on execute().
+
+    Any FakeRedis command can be queued; execute() returns the results in order.
+    """
+
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name: str):
+        command = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._commands.append((command, args, kwargs))
+            return self
+
+        return queue
+
+    def execute(self) -> list:
+        """Run all buffered commands and return their results."""
+        commands, self._commands = self._commands, []
+        return [command(*args, **kwargs) for command, args, kwargs in commands]
+
+    def reset(self) -> None:
+        self._commands = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.reset()
+
+
+class FakeScript:
+    """
+    Stand-in for a registered Lua script.
+
+    Lua is not interpreted; only the WorkerRegistry heartbeat script
+    (HSET heartbeat from TIME, then EXPIRE on every key, skipped when the
+    metadata key no longer exists) is emulated.
+    """
+
+    def __init__(self, redis: "FakeRedis", script: str):
+        self._redis = redis
+        self.script = script
+
+    def __call__(self, keys=None, args=None):
+        if not self._redis.exists(keys[0]):
+            return 0
+        now = time.time()
+        self._redis.hset(keys[0], "heartbeat", f"{now:.6f}")
+        for key in keys:
+            self._redis.expire(key, int(args[0]))
+        return int(now)
+
+
 class FakeRedis:
     """
     Mock Redis client with dict-based storage.
@@ -22,6 +80,13 @@ class FakeRedis:
         self.lists = {}  # key -> list() (lists)
         self.expiry = {}  # key -> expiration timestamp
 
+    def _purge_if_expired(self, key: str) -> None:
+        """Drop a key whose TTL has passed, whatever its type."""
+        if key in self.expiry and self.expiry[key] < time.time():
+            for store in (self.data, self.hashes, self.sets, self.lists):
+                store.pop(key, None)
+            del self.expiry[key]
+
     def hset(self, key: str, field: str = None, value: Any = None, mapping: dict = None) -> int:
         """Set hash field(s)."""
         if key not in self.hashes:
@@ -40,12 +105,22 @@ class FakeRedis:
 
     def hgetall(self, key: str) -> dict:
         """Get all fields and values from hash."""
+        self._purge_if_expired(key)
         return self.hashes.get(key, {}).copy()
 
     def hget(self, key: str, field: str) -> Optional[str]:
         """Get single field from hash."""
+        self._purge_if_expired(key)
         return self.hashes.get(key, {}).get(str(field))
 
+    def register_script(self, script: str) -> FakeScript:
+        """Return a callable stand-in for the Lua script."""
+        return FakeScript(self, script)
+
+    def pipeline(self, transaction: bool = True) -> FakePipeline:
+        """Return a pipeline that buffers commands until execute()."""
+        return FakePipeline(self)
+
     def sadd(self, key: str, *members) -> int:
         """Add member(s) to set."""
         if key not in self.sets:
@@ -161,9 +236,22 @@ class FakeRedis:
         self.data[key] = str(value)
         return True
 
-    def set(self, key: str, value: Any) -> bool:
-        """Set key to value."""
+    def set(self, key: str, value: Any, ex: int = None, nx: bool = False) -> Optional[bool]:
+        """Set key to value.
+
+        Supports the NX (only if missing) and EX (TTL in seconds) options.
+
+        Returns:
+            True if the key was set, None if NX was given and the key existed
+        """
+        if nx and key in self.data:
+            return None
+
         self.data[key] = str(value)
+        if ex is not None:
+            self.expiry[key] = time.time() + ex
+        else:
+            self.expiry.pop(key, None)
         return True
 
     def get(self, key: str) -> Optional[str]:
@@ -233,6 +321,7 @@ class FakeRedis:
         """
         count = 0
         for key in keys:
+            self._purge_if_expired(key)
             if (key in self.data or
                 key in self.hashes or
                 key in self.sets or
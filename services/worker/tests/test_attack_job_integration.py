@@ -18,7 +18,7 @@ from worker.attack.sandbox.base import SandboxUnavailableError
 def _mock_functional_validation(monkeypatch):
     """Monkeypatch validate_attack_functional to be a no-op."""
     monkeypatch.setattr(
-        "worker.attack.validation.validate_functional",
+        "worker.tasks.validate_attack_functional",
         lambda *args, **kwargs: None,
     )
 
@@ -83,7 +83,7 @@ def test_attack_job_basic_flow(db_session, fake_redis, test_helpers, monkeypatch
     # Mock Celery task to prevent actual task execution
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -173,7 +173,7 @@ def test_attack_job_creates_defense_jobs(db_session, fake_redis, test_helpers, m
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -241,7 +241,7 @@ def test_attack_job_skips_in_progress_evaluations(db_session, fake_redis, test_h
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -309,7 +309,7 @@ def test_attack_job_uses_redis_atomic_marking(db_session, fake_redis, test_helpe
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -372,7 +372,7 @@ def test_attack_job_handles_multiple_workers_same_defense(db_session, fake_redis
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -462,7 +462,7 @@ def test_attack_job_mixed_open_closed_workers(db_session, fake_redis, test_helpe
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -522,6 +522,13 @@ def test_attack_job_error_handling(db_session, fake_redis, test_helpers, monkeyp
 
     monkeypatch.setattr(WorkerRegistry, "__init__", fake_init)
 
+    # Create a defense so the job needs Redis to dispatch
+    test_helpers.create_defense(
+        source_type="docker",
+        docker_image="user/defense:latest",
+        is_functional=True
+    )
+
     # Create attack
     attack_id = test_helpers.create_attack()
 
@@ -569,7 +576,7 @@ def test_attack_job_no_validated_defenses(db_session, fake_redis, test_helpers,
     # Mock Celery task
     enqueued_tasks = []
 
-    def mock_apply_async(kwargs):
+    def mock_apply_async(kwargs, **options):
         enqueued_tasks.append(kwargs)
         return None
 
@@ -648,7 +655,7 @@ def _common_setup(db_session, fake_redis, test_helpers, monkeypatch):
     monkeypatch.setattr(tasks_mod.config, "attack", mock_attack_cfg)
 
     # Silence defense-job enqueuing
-    monkeypatch.setattr(tasks_mod.run_batch_defense_job, "apply_async", lambda kw: None)
+    monkeypatch.setattr(tasks_mod.run_batch_defense_job, "apply_async", lambda kw, **options: None)
 
     return attack_id, job_id
 
@@ -658,7 +665,7 @@ def test_attack_job_functional_validation_failure(db_session, fake_redis, test_h
     attack_id, job_id = _common_setup(db_session, fake_redis, test_helpers, monkeypatch)
 
     monkeypatch.setattr(
-        "worker.attack.validation.validate_functional",
+        "worker.tasks.validate_attack_functional",
         lambda *a, **kw: (_ for _ in ()).throw(
             AttackValidationError("ZIP file cannot be decrypted with password 'infected'.")
         ),
@@ -711,12 +718,12 @@ def test_attack_job_heuristic_validation_rejected(db_session, fake_redis, test_h
         lambda tid: [{"filename": "sample1.exe", "behash": "abc", "raw_report": {"tags": ["T1"]}, "source": "virustotal"}],
     )
     monkeypatch.setattr(
-        "worker.attack.sandbox.get_sandbox_backend",
+        "worker.tasks.get_sandbox_backend",
         lambda cfg: Mock(),
     )
     # Heuristic returns 20% -- below the 50% threshold in config
     monkeypatch.setattr(
-        "worker.attack.validation.validate_heuristic",
+        "worker.tasks.validate_heuristic",
         lambda *a, **kw: 20.0,
     )
 
@@ -763,11 +770,11 @@ def test_attack_job_heuristic_sandbox_unavailable(db_session, fake_redis, test_h
         lambda tid: [{"filename": "sample1.exe", "behash": None, "raw_report": None, "source": "virustotal"}],
     )
     monkeypatch.setattr(
-        "worker.attack.sandbox.get_sandbox_backend",
+        "worker.tasks.get_sandbox_backend",
         lambda cfg: Mock(),
     )
     monkeypatch.setattr(
-        "worker.attack.validation.validate_heuristic",
+        "worker.tasks.validate_heuristic",
         lambda *a, **kw: (_ for _ in ()).throw(
             SandboxUnavailableError("VirusTotal unreachable")
         ),
@@ -822,12 +829,12 @@ def test_attack_job_heuristic_accepted_despite_low_score(db_session, fake_redis,
         lambda tid: [{"filename": "sample1.exe", "behash": "abc", "raw_report": {"tags": ["T1"]}, "source": "virustotal"}],
     )
     monkeypatch.setattr(
-        "worker.attack.sandbox.get_sandbox_backend",
+        "worker.tasks.get_sandbox_backend",
         lambda cfg: Mock(),
     )
     # Similarity is 20% -- below 50% threshold, but reject_dissimilar_attacks=False
     monkeypatch.setattr(
-        "worker.attack.validation.validate_heuristic",
+        "worker.tasks.validate_heuristic",
         lambda *a, **kw: 20.0,
     )
 
@@ -0,0 +1,73 @@
+"""Tests for streamed Docker image builds."""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock
+
+import docker
+import pytest
+
+from worker.defense import builder
+from worker.defense.builder import build_image
+
+
+def _client(chunks):
+    client = MagicMock()
+    client.api.build.return_value = (chunk for chunk in chunks)
+    return client
+
+
+def _logger():
+    build_logger = MagicMock()
+    build_logger.isEnabledFor.return_value = True
+    return build_logger
+
+
+def test_build_image_logs_output_in_batches(monkeypatch):
+    """Test that build output is emitted in batches rather than per line."""
+    monkeypatch.setattr(builder, "BUILD_LOG_BATCH_LINES", 2)
+    build_logger = _logger()
+    chunks = [{"stream": "Step 1/3\n"}, {"aux": {"ID": "sha256:abc123"}}, {"stream": "Step 2/3\n"},
+              {"stream": "\n"}, {"stream": "Step 3/3\n"}]
+
+    image_id = build_image(_client(chunks), 60, build_logger, path=".")
+
+    assert image_id == "sha256:abc123"
+    assert [c.args[0] for c in build_logger.info.call_args_list] == [
+        "Step 1/3\nStep 2/3",
+        "Step 3/3",
+    ]
+
+
+def test_build_image_flushes_output_while_streaming(monkeypatch):
+    """Test that a slow build logs its output before the stream ends."""
+    monkeypatch.setattr(builder, "BUILD_LOG_FLUSH_SECONDS", 0)
+    build_logger = _logger()
+    seen = []
+
+    def stream():
+        yield {"stream": "Step 1/2\n"}
+        seen.append(len(build_logger.info.call_args_list))
+        yield {"stream": "Successfully built 0123abcd\n"}
+
+    client = MagicMock()
+    client.api.build.return_value = stream()
+
+    assert build_image(client, 60, build_logger) == "0123abcd"
+    assert seen == [1]
+
+
+def test_build_image_without_image_id_raises_build_error():
+    """Test that a stream that never reports an image is treated as a failed build."""
+    with pytest.raises(docker.errors.BuildError, match="without producing an image"):
+        build_image(_client([{"stream": "Step 1/1\n"}]), 60, _logger())
+
+
+def test_build_image_error_chunk_raises_build_error():
+    """Test that an error in the build log raises BuildError with the log so far."""
+    build_logger = _logger()
+    chunks = [{"stream": "Step 1/1\n"}, {"error": "RUN failed"}]
+
+    with pytest.raises(docker.errors.BuildError, match="RUN failed"):
+        build_image(_client(chunks), 60, build_logger)
+    build_logger.info.assert_called_once_with("Step 1/1")
@@ -6,19 +6,21 @@ import pytest
 from sqlalchemy import text
 
 from worker.db import (
-    get_all_validated_defenses,
     get_unevaluated_attacks,
     check_if_needs_validation,
     mark_defense_validated,
     mark_defense_failed,
     get_attack_files,
-    is_evaluation_in_progress,
+    get_validated_defenses_for_attack,
     mark_attack_validated,
+    set_job_status,
+    insert_evaluations,
+    ensure_evaluation_runs,
 )
 
 
-def test_get_all_validated_defenses(db_session, test_helpers):
-    """Test querying all validated defenses."""
+def test_get_validated_defenses_for_attack_filters_unvalidated(db_session, test_helpers):
+    """Test only functional defenses are returned for an attack."""
     # Create defenses with different states
     def1_id = test_helpers.create_defense(
         source_type="docker",
@@ -51,14 +53,14 @@ def test_get_all_validated_defenses(db_session, test_helpers):
     )
 
     # Query validated defenses
-    validated = get_all_validated_defenses()
+    validated = get_validated_defenses_for_attack(test_helpers.create_attack())
 
     assert len(validated) == 2
     assert def1_id in validated
     assert def2_id in validated
 
 
-def test_get_all_validated_defenses_filters_deleted(db_session, test_helpers):
+def test_get_validated_defenses_for_attack_filters_deleted(db_session, test_helpers):
     """Test that deleted defenses are excluded."""
     # Create validated defense
     def_id = test_helpers.create_defense(
@@ -76,16 +78,16 @@ def test_get_all_validated_defenses_filters_deleted(db_session, test_helpers):
     db_session.commit()
 
     # Query should exclude deleted
-    validated = get_all_validated_defenses()
+    validated = get_validated_defenses_for_attack(test_helpers.create_attack())
 
     assert def_id not in validated
 
 
-def test_get_all_validated_defenses_empty(db_session):
+def test_get_validated_defenses_for_attack_empty(db_session, test_helpers):
     """Test querying when no validated defenses exist."""
-    validated = get_all_validated_defenses()
+    validated = get_validated_defenses_for_attack(test_helpers.create_attack())
 
-    assert validated == []
+    assert validated == {}
 
 
 def test_get_unevaluated_attacks(db_session, test_helpers):
@@ -346,83 +348,36 @@ def test_get_attack_files_ordered_by_created_at(db_session, test_helpers):
     assert files[2]["filename"] == "third.exe"
 
 
-def test_is_evaluation_in_progress_queued(db_session, test_helpers):
-    """Test checking if evaluation is queued."""
-    # Create defense and attack
-    defense_id = test_helpers.create_defense(
-        source_type="docker", docker_image="test")
-    attack_id = test_helpers.create_attack()
-
-    # Create queued evaluation run
-    test_helpers.create_evaluation_run(defense_id, attack_id, status="queued")
-
-    # Should return True
-    in_progress = is_evaluation_in_progress(defense_id, attack_id)
-
-    assert in_progress is True
-
-
-def test_is_evaluation_in_progress_running(db_session, test_helpers):
-    """Test checking if evaluation is running."""
-    # Create defense and attack
-    defense_id = test_helpers.create_defense(
-        source_type="docker", docker_image="test")
-    attack_id = test_helpers.create_attack()
-
-    # Create running evaluation run
-    test_helpers.create_evaluation_run(defense_id, attack_id, status="running")
-
-    # Should return True
-    in_progress = is_evaluation_in_progress(defense_id, attack_id)
-
-    assert in_progress is True
-
-
-def test_is_evaluation_in_progress_done(db_session, test_helpers):
-    """Test checking if evaluation is done (not in progress)."""
-    # Create defense and attack
-    defense_id = test_helpers.create_defense(
-        source_type="docker", docker_image="test")
-    attack_id = test_helpers.create_attack()
-
-    # Create done evaluation run
-    test_helpers.create_evaluation_run(defense_id, attack_id, status="done")
-
-    # Should return False (done is not "in progress")
-    in_progress = is_evaluation_in_progress(defense_id, attack_id)
-
-    assert in_progress is False
-
-
-def test_is_evaluation_in_progress_failed(db_session, test_helpers):
-    """Test checking if evaluation failed (not in progress)."""
-    # Create defense and attack
-    defense_id = test_helpers.create_defense(
-        source_type="docker", docker_image="test")
-    attack_id = test_helpers.create_attack()
-
-    # Create failed evaluation run
-    test_helpers.create_evaluation_run(defense_id, attack_id, status="failed")
-
-    # Should return False
-    in_progress = is_evaluation_in_progress(defense_id, attack_id)
-
-    assert in_progress is False
-
-
-def test_is_evaluation_in_progress_none(db_session, test_helpers):
-    """Test checking when no evaluation run exists."""
-    # Create defense and attack
-    defense_id = test_helpers.create_defense(
-        source_type="docker", docker_image="test")
+def test_get_validated_defenses_for_attack(db_session, test_helpers):
+    """Test validated defenses are flagged only for queued/running pairs."""
     attack_id = test_helpers.create_attack()
+    defense_ids = {}
+    for status in ("queued", "running", "done", "failed", None):
+        defense_id = test_helpers.create_defense(
+            source_type="docker",
+            docker_image="user/defense:latest",
+            is_functional=True
+        )
+        if status is not None:
+            test_helpers.create_evaluation_run(defense_id, attack_id, status=status)
+        defense_ids[status] = defense_id
 
-    # No evaluation run created
+    # Not yet validated (excluded)
+    test_helpers.create_defense(
+        source_type="docker",
+        docker_image="user/pending:latest",
+        is_functional=None
+    )
 
-    # Should return False
-    in_progress = is_evaluation_in_progress(defense_id, attack_id)
+    progress = get_validated_defenses_for_attack(attack_id)
 
-    assert in_progress is False
+    assert progress == {
+        defense_ids["queued"]: True,
+        defense_ids["running"]: True,
+        defense_ids["done"]: False,
+        defense_ids["failed"]: False,
+        defense_ids[None]: False,
+    }
 
 
 def test_mark_attack_validated(db_session, test_helpers):
@@ -620,3 +575,143 @@ def test_mark_attack_validated_replaces_active_submission(db_session, test_helpe
         {"uid": user_id},
     ).scalar()
     assert str(active) == attack2_id
+
+
+def test_set_job_status_error_merges_into_payload(db_session, test_helpers):
+    """Error is stored under payload.error without dropping existing payload keys."""
+    defense_id = test_helpers.create_defense(source_type="docker", docker_image="user/defense:latest")
+    job_id = test_helpers.create_job("defense", defense_submission_id=defense_id)
+
+    set_job_status(job_id=job_id, status="failed", error="build failed")
+
+    row = db_session.execute(
+        text("SELECT status, payload FROM jobs WHERE id = CAST(:id AS uuid)"),
+        {"id": job_id},
+    ).mappings().first()
+    assert row["status"] == "failed"
+    assert row["payload"]["error"] == "build failed"
+    assert row["payload"]["defense_submission_id"] == defense_id
+
+
+def test_insert_evaluations_writes_all_rows(db_session, test_helpers):
+    """Test batched file results are written in one call."""
+    defense_id = test_helpers.create_defense(
+        source_type="docker",
+        docker_image="user/defense:latest",
+        is_functional=True
+    )
+    attack_id = test_helpers.create_attack(file_count=2)
+    run_id = test_helpers.create_evaluation_run(defense_id, attack_id, status="running")
+    files = get_attack_files(attack_id)
+
+    insert_evaluations([
+        {"evaluation_run_id": run_id, "attack_file_id": files[0]["id"],
+         "result": 1, "duration_ms": 12},
+        {"evaluation_run_id": run_id, "attack_file_id": files[1]["id"],
+         "error": "Cache/MinIO error: boom", "duration_ms": 0},
+    ])
+
+    rows = db_session.execute(
+        text("""
+            SELECT model_output, error FROM evaluation_file_results
+            WHERE evaluation_run_id = CAST(:id AS uuid)
+            ORDER BY error NULLS FIRST
+        """),
+        {"id": run_id}
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [(1, None), (None, "Cache/MinIO error: boom")]
+
+
+def test_insert_evaluations_copies_large_batches(db_session, test_helpers, monkeypatch):
+    """Test batches over the COPY threshold are loaded with escaped values."""
+    monkeypatch.setattr("worker.db.EVALUATION_COPY_MIN_ROWS", 2)
+    defense_id = test_helpers.create_defense(
+        source_type="docker",
+        docker_image="user/defense:latest",
+        is_functional=True
+    )
+    attack_id = test_helpers.create_attack(file_count=2)
+    run_id = test_helpers.create_evaluation_run(defense_id, attack_id, status="running")
+    files = get_attack_files(attack_id)
+
+    insert_evaluations([
+        {"evaluation_run_id": run_id, "attack_file_id": files[0]["id"],
+         "result": 0, "duration_ms": 7, "evaded_reason": "time_limit"},
+        {"evaluation_run_id": run_id, "attack_file_id": files[1]["id"],
+         "error": "line one\n\tC:\\path", "duration_ms": 0},
+    ])
+
+    rows = db_session.execute(
+        text("""
+            SELECT model_output, error, duration_ms, evaded_reason FROM evaluation_file_results
+            WHERE evaluation_run_id = CAST(:id AS uuid)
+            ORDER BY error NULLS FIRST
+        """),
+        {"id": run_id}
+    ).fetchall()
+    assert [tuple(r) for r in rows] == [
+        (0, None, 7, "time_limit"),
+        (None, "line one\n\tC:\\path", 0, None),
+    ]
+
+
+def test_ensure_evaluation_runs_creates_one_run_per_defense(db_session, test_helpers):
+    """Test runs for several defenses are created by one call."""
+    def1_id = test_helpers.create_defense(
+        source_type="docker", docker_image="user/one:latest", is_functional=True
+    )
+    def2_id = test_helpers.create_defense(
+        source_type="docker", docker_image="user/two:latest", is_functional=True
+    )
+    attack_id = test_helpers.create_attack(file_count=1)
+
+    runs = ensure_evaluation_runs(
+        defense_submission_ids=[def1_id, def2_id],
+        attack_submission_id=attack_id,
+    )
+
+    assert set(runs) == {def1_id, def2_id}
+    rows = db_session.execute(
+        text("""
+            SELECT id::text, defense_submission_id::text, status FROM evaluation_runs
+            WHERE attack_submission_id = CAST(:id AS uuid)
+        """),
+        {"id": attack_id}
+    ).fetchall()
+    assert {(r[1], r[0]) for r in rows} == set(runs.items())
+    assert {r[2] for r in rows} == {"running"}
+    assert ensure_evaluation_runs(defense_submission_ids=[], attack_submission_id=attack_id) == {}
+
+
+def test_eval_session_contains_failed_write(db_session, test_helpers):
+    """Test a failed batch inside eval_session does not roll back the others."""
+    from sqlalchemy.exc import IntegrityError
+    from worker.db import eval_session
+
+    defense_id = test_helpers.create_defense(
+        source_type="docker",
+        docker_image="user/defense:latest",
+        is_functional=True
+    )
+    attack_id = test_helpers.create_attack(file_count=2)
+    run_id = test_helpers.create_evaluation_run(defense_id, attack_id, status="running")
+    files = get_attack_files(attack_id)
+
+    with eval_session() as conn:
+        insert_evaluations([
+            {"evaluation_run_id": run_id, "attack_file_id": files[0]["id"], "result": 1},
+        ], conn=conn)
+        with pytest.raises(IntegrityError):
+            insert_evaluations([
+                {"evaluation_run_id": "00000000-0000-0000-0000-000000000000",
+                 "attack_file_id": files[1]["id"], "result": 0},
+            ], conn=conn)
+        insert_evaluations([
+            {"evaluation_run_id": run_id, "attack_file_id": files[1]["id"], "result": 0},
+        ], conn=conn)
+
+    count = db_session.execute(
+        text("SELECT COUNT(*) FROM evaluation_file_results WHERE evaluation_run_id = CAST(:id AS uuid)"),
+        {"id": run_id}
+    ).scalar()
+    assert count == 2
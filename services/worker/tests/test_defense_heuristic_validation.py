@@ -102,7 +102,7 @@ def test_all_malware_detected_gives_tpr_one():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"MZ" + b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"MZ" + b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
@@ -136,7 +136,7 @@ def test_all_samples_evaded_gives_worst_case_malware_metrics():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
@@ -173,7 +173,7 @@ def test_mixed_samples_perfect_classifier():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=[malware_sample, goodware_sample]), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch("worker.defense.validation.random.shuffle"), \
@@ -213,7 +213,7 @@ def test_reject_heurval_failures_true_low_tpr_raises():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
@@ -247,7 +247,7 @@ def test_reject_heurval_failures_false_low_tpr_accepted():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
@@ -280,7 +280,7 @@ def test_container_restart_error_propagates():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", return_value="result-id-1"), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
@@ -314,7 +314,7 @@ def test_upsert_called_twice_with_null_then_real_metrics():
     with patch("worker.defense.validation.get_active_heurval_set", return_value=_make_sample_set()), \
          patch("worker.defense.validation.get_heurval_samples", return_value=samples), \
          patch("worker.defense.validation.get_sample_path", return_value="/tmp/sample.exe"), \
-         patch("pathlib.Path.read_bytes", return_value=b"\x00" * 64), \
+         patch("worker.defense.validation.read_sample", return_value=b"\x00" * 64), \
          patch("worker.defense.validation.upsert_heurval_result", mock_upsert), \
          patch("worker.defense.validation.insert_heurval_file_result"), \
          patch(
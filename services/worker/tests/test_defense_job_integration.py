@@ -34,7 +34,7 @@ class FakeContainer:
     def stop(self, timeout=2):
         pass
 
-    def remove(self):
+    def remove(self, force=False):
         pass
 
     def logs(self):
@@ -107,6 +107,7 @@ def test_defense_job_basic_flow(db_session, fake_redis, test_helpers, monkeypatc
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"result": 1}
+    mock_response.content = b'{"result": 1}'
     mock_response.headers = {"Content-Type": "application/json"}
 
     def mock_get(*args, **kwargs):
@@ -116,7 +117,13 @@ def test_defense_job_basic_flow(db_session, fake_redis, test_helpers, monkeypatc
         return mock_response
 
     monkeypatch.setattr("requests.get", mock_get)
+
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", mock_get)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
     monkeypatch.setattr("requests.post", mock_post)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", mock_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", mock_post)
+    monkeypatch.setattr("worker.defense.validation._SESSION.post", mock_post)
 
     # Mock validation
     monkeypatch.setattr(
@@ -131,7 +138,7 @@ def test_defense_job_basic_flow(db_session, fake_redis, test_helpers, monkeypatc
 
     eval_mock = AsyncMock()
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", eval_mock)
+        "worker.tasks.evaluate_defenses_async", eval_mock)
 
     # Run defense job
     run_defense_job(
@@ -164,8 +171,8 @@ def test_defense_job_basic_flow(db_session, fake_redis, test_helpers, monkeypatc
     assert defense_contexts[0]["defense_submission_id"] == defense_id
 
 
-def test_defense_job_populates_internal_queue(db_session, fake_redis, test_helpers, monkeypatch, config_dict):
-    """Test defense job populates INTERNAL_QUEUE with unevaluated attacks."""
+def test_defense_job_passes_pending_attacks(db_session, fake_redis, test_helpers, monkeypatch, config_dict):
+    """Test defense job hands unevaluated attacks to the evaluation loop."""
     # Monkeypatch Redis client
     from worker import tasks
     from worker.redis_client import WorkerRegistry
@@ -216,9 +223,15 @@ def test_defense_job_populates_internal_queue(db_session, fake_redis, test_helpe
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"result": 1}
+    mock_response.content = b'{"result": 1}'
     mock_response.headers = {"Content-Type": "application/json"}
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
     monkeypatch.setattr("requests.post", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.post", lambda *args, **kwargs: mock_response)
 
     # Mock image handler
     monkeypatch.setattr(
@@ -226,24 +239,17 @@ def test_defense_job_populates_internal_queue(db_session, fake_redis, test_helpe
 
     eval_mock = AsyncMock()
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", eval_mock)
-
-    # Mock unregister to preserve queue for assertion
-    monkeypatch.setattr(WorkerRegistry, "unregister",
-                        lambda self, worker_id: None)
+        "worker.tasks.evaluate_defenses_async", eval_mock)
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
 
-    # Verify INTERNAL_QUEUE contains attack2 and attack3 (not attack1)
-    worker_id = eval_mock.call_args.kwargs["worker_id"]
-    queue_key = f"worker:{worker_id}:attacks"
-    queue_items = fake_redis.lrange(queue_key, 0, -1)
-    queue_attacks = {item.decode() for item in queue_items}
+    # Verify attack2 and attack3 (not attack1) are handed to evaluation
+    initial_attacks = set(eval_mock.call_args.kwargs["initial_attacks"])
 
-    assert attack2_id in queue_attacks
-    assert attack3_id in queue_attacks
-    assert attack1_id not in queue_attacks
+    assert attack2_id in initial_attacks
+    assert attack3_id in initial_attacks
+    assert attack1_id not in initial_attacks
 
 
 def test_defense_job_validation_failure(db_session, fake_redis, test_helpers, monkeypatch, config_dict):
@@ -290,9 +296,15 @@ def test_defense_job_validation_failure(db_session, fake_redis, test_helpers, mo
     mock_response = Mock()
     mock_response.status_code = 200
     mock_response.json.return_value = {"result": 1}
+    mock_response.content = b'{"result": 1}'
     mock_response.headers = {"Content-Type": "application/json"}
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
     monkeypatch.setattr("requests.post", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.post", lambda *args, **kwargs: mock_response)
 
     # Mock image handler
     monkeypatch.setattr(
@@ -372,6 +384,9 @@ def test_defense_job_container_not_ready(db_session, fake_redis, test_helpers, m
 
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
 
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
+
     # Mock image handler
     monkeypatch.setattr(
         "worker.defense.docker_handler.pull_and_resolve_docker_image", lambda x: x)
@@ -445,6 +460,8 @@ def test_defense_job_github_source(db_session, fake_redis, test_helpers, monkeyp
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock GitHub handler
     github_called = []
@@ -458,7 +475,7 @@ def test_defense_job_github_source(db_session, fake_redis, test_helpers, monkeyp
 
     # Mock evaluation
     monkeypatch.setattr(
-        "worker.tasks.evaluate_defense_with_redis", lambda *args, **kwargs: None)
+        "worker.tasks.evaluate_defenses_async", AsyncMock(return_value=None))
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -513,6 +530,8 @@ def test_defense_job_zip_source(db_session, fake_redis, test_helpers, monkeypatc
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock ZIP handler
     zip_called = []
@@ -526,7 +545,7 @@ def test_defense_job_zip_source(db_session, fake_redis, test_helpers, monkeypatc
 
     # Mock evaluation
     monkeypatch.setattr(
-        "worker.tasks.evaluate_defense_with_redis", lambda *args, **kwargs: None)
+        "worker.tasks.evaluate_defenses_async", AsyncMock(return_value=None))
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -569,16 +588,12 @@ def test_defense_job_cleanup_on_error(db_session, fake_redis, test_helpers, monk
     fake_container = FakeContainer()
     fake_network = FakeNetwork(f"eval_net_{job_id}")
 
-    container_stopped = []
     container_removed = []
     network_disconnected = []
     network_removed = []
 
-    def mock_stop(timeout=2):
-        container_stopped.append(True)
-
-    def mock_remove():
-        container_removed.append(True)
+    def mock_remove(force=False):
+        container_removed.append(force)
 
     def mock_disconnect(container, force=True):
         network_disconnected.append(True)
@@ -586,7 +601,6 @@ def test_defense_job_cleanup_on_error(db_session, fake_redis, test_helpers, monk
     def mock_network_remove():
         network_removed.append(True)
 
-    fake_container.stop = mock_stop
     fake_container.remove = mock_remove
     fake_network.disconnect = mock_disconnect
     fake_network.remove = mock_network_remove
@@ -606,6 +620,8 @@ def test_defense_job_cleanup_on_error(db_session, fake_redis, test_helpers, monk
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock image handler
     monkeypatch.setattr(
@@ -614,7 +630,7 @@ def test_defense_job_cleanup_on_error(db_session, fake_redis, test_helpers, monk
     monkeypatch.setattr("worker.tasks.create_eval_network",
                         lambda *args, **kwargs: fake_network)
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async",
+        "worker.tasks.evaluate_defenses_async",
         AsyncMock(side_effect=RuntimeError("Evaluation crashed")))
 
     # Run defense job (should fail but cleanup)
@@ -622,8 +638,7 @@ def test_defense_job_cleanup_on_error(db_session, fake_redis, test_helpers, monk
         run_defense_job(job_id=job_id, defense_submission_id=defense_id)
 
     # Verify cleanup happened
-    assert len(container_stopped) == 1
-    assert len(container_removed) == 1
+    assert container_removed == [True]
     assert len(network_disconnected) == 1
     assert len(network_removed) == 1
 
@@ -675,13 +690,15 @@ def test_defense_job_unregisters_worker_on_error(db_session, fake_redis, test_he
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock image handler
     monkeypatch.setattr(
         "worker.defense.docker_handler.pull_and_resolve_docker_image", lambda x: x)
 
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async",
+        "worker.tasks.evaluate_defenses_async",
         AsyncMock(side_effect=RuntimeError("Evaluation error")))
 
     # Run defense job (should fail)
@@ -740,6 +757,8 @@ def test_defense_job_cleanup_built_images(db_session, fake_redis, test_helpers,
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock github handler to return test image name
     test_image = "test-defense:abc123"
@@ -755,7 +774,7 @@ def test_defense_job_cleanup_built_images(db_session, fake_redis, test_helpers,
     )
 
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", AsyncMock())
+        "worker.tasks.evaluate_defenses_async", AsyncMock())
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -816,6 +835,8 @@ def test_defense_job_removes_docker_hub_images(db_session, fake_redis, test_help
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock docker handler
     monkeypatch.setattr(
@@ -830,7 +851,7 @@ def test_defense_job_removes_docker_hub_images(db_session, fake_redis, test_help
     )
 
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", AsyncMock())
+        "worker.tasks.evaluate_defenses_async", AsyncMock())
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -891,6 +912,8 @@ def test_defense_job_keeps_docker_hub_images_when_disabled(db_session, fake_redi
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock docker handler
     monkeypatch.setattr(
@@ -905,7 +928,7 @@ def test_defense_job_keeps_docker_hub_images_when_disabled(db_session, fake_redi
     )
 
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", AsyncMock())
+        "worker.tasks.evaluate_defenses_async", AsyncMock())
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -914,8 +937,8 @@ def test_defense_job_keeps_docker_hub_images_when_disabled(db_session, fake_redi
     mock_docker_client.images.remove.assert_not_called()
 
 
-def test_defense_job_cleanup_on_container_stop_failure(db_session, fake_redis, test_helpers, monkeypatch, config_dict):
-    """Test that network and image cleanup happens even if container.stop() fails."""
+def test_defense_job_cleanup_on_container_remove_failure(db_session, fake_redis, test_helpers, monkeypatch, config_dict):
+    """Test that network and image cleanup happens even if container.remove() fails."""
     from worker import tasks
     from worker.redis_client import WorkerRegistry
 
@@ -943,11 +966,11 @@ def test_defense_job_cleanup_on_container_stop_failure(db_session, fake_redis, t
     # Mock Docker
     fake_container = FakeContainer()
 
-    # Make container.stop() raise an exception
-    def failing_stop(timeout=2):
-        raise Exception("Container stop failed")
+    # Make container.remove() raise an exception
+    def failing_remove(force=False):
+        raise Exception("Container remove failed")
 
-    fake_container.stop = failing_stop
+    fake_container.remove = failing_remove
 
     # Create fake network with Mock methods for assertions
     fake_network = Mock()
@@ -967,6 +990,8 @@ def test_defense_job_cleanup_on_container_stop_failure(db_session, fake_redis, t
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock GitHub handler
     built_image_name = "mlsec-defense-github-123"
@@ -984,7 +1009,7 @@ def test_defense_job_cleanup_on_container_stop_failure(db_session, fake_redis, t
     monkeypatch.setattr("worker.tasks.create_eval_network",
                         lambda *args, **kwargs: fake_network)
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", AsyncMock())
+        "worker.tasks.evaluate_defenses_async", AsyncMock())
 
     # Run defense job (should complete despite container cleanup failure)
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -993,7 +1018,7 @@ def test_defense_job_cleanup_on_container_stop_failure(db_session, fake_redis, t
     fake_network.disconnect.assert_called_once()
     fake_network.remove.assert_called_once()
 
-    # Verify image cleanup was attempted (despite container.stop() failure)
+    # Verify image cleanup was attempted (despite container.remove() failure)
     mock_docker_client.images.remove.assert_called_once_with(
         built_image_name, force=True
     )
@@ -1062,6 +1087,8 @@ def test_defense_job_respects_cleanup_config(db_session, fake_redis, test_helper
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     # Mock GitHub handler
     built_image_name = "mlsec-defense-github-456"
@@ -1077,7 +1104,7 @@ def test_defense_job_respects_cleanup_config(db_session, fake_redis, test_helper
     )
 
     monkeypatch.setattr(
-        "worker.defense.evaluate.evaluate_defenses_async", AsyncMock())
+        "worker.tasks.evaluate_defenses_async", AsyncMock())
 
     # Run defense job
     run_defense_job(job_id=job_id, defense_submission_id=defense_id)
@@ -1132,6 +1159,8 @@ def test_batch_partial_validation_failure(db_session, fake_redis, test_helpers,
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     monkeypatch.setattr(
         "worker.defense.docker_handler.pull_and_resolve_docker_image", lambda x: x
@@ -1144,7 +1173,7 @@ def test_batch_partial_validation_failure(db_session, fake_redis, test_helpers,
     monkeypatch.setattr("worker.tasks.validate_functional", selective_validate)
 
     eval_mock = AsyncMock()
-    monkeypatch.setattr("worker.defense.evaluate.evaluate_defenses_async", eval_mock)
+    monkeypatch.setattr("worker.tasks.evaluate_defenses_async", eval_mock)
 
     run_batch_defense_job(job_id=job_id, defense_submission_ids=[defense_a_id, defense_b_id])
 
@@ -1216,6 +1245,8 @@ def test_batch_all_validation_failure(db_session, fake_redis, test_helpers, monk
     mock_response = Mock()
     mock_response.status_code = 200
     monkeypatch.setattr("requests.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.defense.validation._SESSION.get", lambda *args, **kwargs: mock_response)
+    monkeypatch.setattr("worker.tasks._port_accepts_connections", lambda url: True)
 
     monkeypatch.setattr(
         "worker.defense.docker_handler.pull_and_resolve_docker_image", lambda x: x
@@ -1227,7 +1258,7 @@ def test_batch_all_validation_failure(db_session, fake_redis, test_helpers, monk
     )
 
     eval_mock = AsyncMock()
-    monkeypatch.setattr("worker.defense.evaluate.evaluate_defenses_async", eval_mock)
+    monkeypatch.setattr("worker.tasks.evaluate_defenses_async", eval_mock)
 
     run_batch_defense_job(job_id=job_id, defense_submission_ids=[defense_a_id, defense_b_id])
 
@@ -1246,3 +1277,39 @@ def test_batch_all_validation_failure(db_session, fake_redis, test_helpers, monk
         {"id": job_id},
     ).scalar()
     assert job_status == "done"
+
+
+def test_setup_removes_network_when_gateway_connect_fails(monkeypatch):
+    """Test a network created before a failed gateway connect is removed."""
+    import asyncio
+    from worker import tasks
+
+    fake_network = Mock()
+    fake_network.connect.side_effect = RuntimeError("connect failed")
+    mock_docker_client = Mock()
+    failed = []
+
+    monkeypatch.setattr("docker.from_env", lambda: mock_docker_client)
+    monkeypatch.setattr("worker.tasks.create_eval_network", lambda *args, **kwargs: fake_network)
+    monkeypatch.setattr("worker.tasks._acquire_defense_image", AsyncMock(return_value="img:latest"))
+    monkeypatch.setattr("worker.tasks.mark_defense_failed", lambda dsid, msg: failed.append(msg))
+
+    registry = Mock()
+    registry.lease_gateway_port.return_value = 10000
+
+    ctx = asyncio.run(tasks._setup_defense_container(
+        defense_submission_id="12345678-0000-0000-0000-000000000000",
+        job_id="job-1",
+        needs_validation=False,
+        source_type="docker",
+        source_data={},
+        registry=registry,
+        config_dict={},
+        log_config=None,
+    ))
+
+    assert ctx is None
+    assert failed == ["Network setup failed: connect failed"]
+    registry.release_gateway_port.assert_called_once_with(10000)
+    fake_network.remove.assert_called_once()
+    mock_docker_client.containers.run.assert_not_called()
@@ -3,10 +3,12 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 import requests
+import urllib3
 
 from worker.config import EvaluationConfig
 from worker.defense.evaluate import (
@@ -48,7 +50,7 @@ def _mock_docker(usage_mb: float = 100.0) -> MagicMock:
 def _mock_response(result: int, status_code: int = 200) -> MagicMock:
     resp = MagicMock(spec=requests.Response)
     resp.status_code = status_code
-    resp.json.return_value = {"result": result}
+    resp.content = json.dumps({"result": result}).encode()
     return resp
 
 
@@ -72,8 +74,8 @@ def test_normal_response_returns_correct_model_output():
     restart_ref = [0]
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(1)):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(1)):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(1)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_ref, ctx={}
                 )
@@ -90,8 +92,8 @@ def test_normal_response_result_zero():
     docker_client = _mock_docker(usage_mb=50)
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(0)):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(0)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(0)):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(0)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, [0], ctx={}
                 )
@@ -116,8 +118,8 @@ def test_timeout_returns_time_limit_evaded():
             requests.exceptions.Timeout("timed out"),
             _mock_response(1),
         ]
-        with patch("worker.defense.evaluate.requests.post", side_effect=post_side_effects):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", side_effect=post_side_effects):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(1)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, [0], ctx={}
                 )
@@ -142,7 +144,7 @@ def test_full_timeout_triggers_restart():
             requests.exceptions.Timeout("initial timeout"),
             requests.exceptions.Timeout("extended timeout"),
         ]
-        with patch("worker.defense.evaluate.requests.post", side_effect=post_side_effects):
+        with patch("worker.defense.evaluate._SESSION.post", side_effect=post_side_effects):
             with patch("worker.defense.evaluate._wait_for_container_ready", new_callable=AsyncMock):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_ref, ctx={}
@@ -171,8 +173,8 @@ def test_full_timeout_raises_when_max_restarts_exceeded():
             requests.exceptions.Timeout("initial"),
             requests.exceptions.Timeout("extended"),
         ]
-        with patch("worker.defense.evaluate.requests.post", side_effect=post_side_effects):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", side_effect=post_side_effects):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(1)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_ref, ctx={}
                 )
@@ -191,7 +193,7 @@ def test_ram_overuse_returns_ram_limit_evaded():
     docker_client = _mock_docker(usage_mb=600)
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(1)):
             with patch("worker.defense.evaluate._wait_for_container_ready", new_callable=AsyncMock):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, [0], ctx={}
@@ -210,8 +212,8 @@ def test_ram_overuse_raises_when_max_restarts_exceeded():
     restart_ref = [1]  # already at max
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(1)):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(1)):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(1)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_ref, ctx={}
                 )
@@ -226,8 +228,8 @@ def test_ram_within_limit_does_not_evade():
     docker_client = _mock_docker(usage_mb=100)
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(1)):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(1)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(1)):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(1)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, [0], ctx={}
                 )
@@ -258,8 +260,8 @@ def test_docker_stats_failure_does_not_crash():
     docker_client.containers.get.side_effect = Exception("Docker unavailable")
 
     async def run():
-        with patch("worker.defense.evaluate.requests.post", return_value=_mock_response(0)):
-            with patch("worker.defense.evaluate.requests.get", return_value=_mock_response(0)):
+        with patch("worker.defense.evaluate._SESSION.post", return_value=_mock_response(0)):
+            with patch("worker.defense.evaluate._SESSION.get", return_value=_mock_response(0)):
                 return await evaluate_sample_against_container(
                     URL, docker_client, CONTAINER, SAMPLE, eval_cfg, [0], ctx={}
                 )
@@ -267,3 +269,242 @@ def test_docker_stats_failure_does_not_crash():
     outcome = _run(run())
     assert outcome.evaded_reason is None
     assert outcome.model_output == 0
+
+
+def test_mid_request_connection_drop_is_not_retried():
+    """A connection dropped after the sample was sent is scored as a crash."""
+    eval_cfg = _make_eval_cfg()
+    docker_client = _mock_docker()
+    dropped = requests.exceptions.ConnectionError(
+        urllib3.exceptions.ProtocolError("Connection aborted.", ConnectionResetError(104, "reset"))
+    )
+    restart_count = [0]
+
+    async def run():
+        with patch("worker.defense.evaluate._SESSION.post", side_effect=dropped) as post:
+            with patch("worker.defense.evaluate._wait_for_container_ready"):
+                outcome = await evaluate_sample_against_container(
+                    URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_count, ctx={}
+                )
+        assert post.call_count == 1
+        return outcome
+
+    outcome = _run(run())
+    assert outcome.evaded_reason == "connection_error"
+    assert outcome.model_output == 0
+    assert restart_count == [1]
+    docker_client.containers.get.return_value.restart.assert_called_once()
+
+
+def test_failed_connect_is_retried_within_remaining_timeout():
+    """A connection that was never opened is retried once with the time left."""
+    eval_cfg = _make_eval_cfg()
+    docker_client = _mock_docker()
+    refused = requests.exceptions.ConnectionError(
+        urllib3.exceptions.MaxRetryError(
+            None, URL, urllib3.exceptions.NewConnectionError(None, "Connection refused")
+        )
+    )
+    restart_count = [0]
+
+    async def run():
+        with patch(
+            "worker.defense.evaluate._SESSION.post",
+            side_effect=[refused, _mock_response(1)],
+        ) as post:
+            outcome = await evaluate_sample_against_container(
+                URL, docker_client, CONTAINER, SAMPLE, eval_cfg, restart_count, ctx={}
+            )
+        assert post.call_count == 2
+        first, second = (c.kwargs["timeout"] for c in post.call_args_list)
+        assert second <= first
+        return outcome
+
+    outcome = _run(run())
+    assert outcome.evaded_reason is None
+    assert outcome.model_output == 1
+    assert restart_count == [0]
+
+
+# ---------------------------------------------------------------------------
+# HTTP session retries
+# ---------------------------------------------------------------------------
+
+def test_http_session_without_retries_fails_fast():
+    """request_retries=0 leaves the adapter with no retry budget."""
+    from worker.defense.evaluate import _build_http_session
+
+    adapter = _build_http_session(0).get_adapter(URL)
+    assert adapter.max_retries.total == 0
+
+
+def test_http_session_retries_never_retry_reads():
+    """Configured retries cover connect/5xx failures but never read timeouts."""
+    from worker.defense.evaluate import _build_http_session
+
+    retry = _build_http_session(3).get_adapter(URL).max_retries
+    assert retry.total == 3
+    assert retry.read is False
+    assert 502 in retry.status_forcelist
+
+
+# ---------------------------------------------------------------------------
+# Shared sample loader
+# ---------------------------------------------------------------------------
+
+def test_sample_loader_shares_prefetches_and_releases():
+    """Each file is loaded once, prefetched ahead, and released once all took it."""
+    from worker.defense import evaluate
+
+    loaded = []
+
+    async def fake_load(key):
+        loaded.append(key)
+        return b"x" * 10
+
+    files = [{"object_key": f"k{i}"} for i in range(3)]
+
+    async def scenario():
+        loader = evaluate._SampleLoader(files, consumers=2, max_bytes=1 << 20)
+        assert await loader.load(0) == b"x" * 10
+        await asyncio.sleep(0)
+        assert loaded == ["k0", "k1"]
+        assert await loader.load(0) == b"x" * 10
+        assert 0 not in loader._tasks
+        loader.cancel()
+
+    with patch.object(evaluate, "_load_sample", fake_load):
+        _run(scenario())
+
+    assert loaded == ["k0", "k1"]
+
+
+def test_sample_loader_stops_prefetch_at_byte_budget():
+    """No file is prefetched while held samples exceed the byte budget."""
+    from worker.defense import evaluate
+
+    loaded = []
+
+    async def fake_load(key):
+        loaded.append(key)
+        return b"x" * 100
+
+    files = [{"object_key": f"k{i}"} for i in range(3)]
+
+    async def scenario():
+        loader = evaluate._SampleLoader(files, consumers=2, max_bytes=100)
+        await loader.load(0)
+        await asyncio.sleep(0)
+        # k0 is still held for the second consumer and k1 is prefetched.
+        await loader.load(1)
+        await asyncio.sleep(0)
+        loader.cancel()
+
+    with patch.object(evaluate, "_load_sample", fake_load):
+        _run(scenario())
+
+    assert loaded == ["k0", "k1"]
+
+
+# ---------------------------------------------------------------------------
+# Result buffer
+# ---------------------------------------------------------------------------
+
+def test_result_buffer_keeps_rows_until_written():
+    """A failed batch is retried row by row instead of being dropped."""
+    from worker.defense import evaluate
+
+    written = []
+
+    def fake_insert(rows, conn=None):
+        if len(rows) > 1 or rows[0]["attack_file_id"] == "bad":
+            raise RuntimeError("insert failed")
+        written.extend(rows)
+
+    buffer = evaluate._ResultBuffer(conn=MagicMock(), batch_size=10)
+    buffer.add(evaluation_run_id="r", attack_file_id="f1", result=1)
+    buffer.add(evaluation_run_id="r", attack_file_id="bad", result=0)
+    buffer.add(evaluation_run_id="r", attack_file_id="f2", result=0)
+
+    with patch.object(evaluate, "insert_evaluations", side_effect=fake_insert):
+        buffer.flush()
+
+    assert [row["attack_file_id"] for row in written] == ["f1", "f2"]
+    assert buffer._rows == []
+
+
+def test_sample_loader_caps_bytes_held_for_slow_consumer():
+    """A fast consumer waits once the samples held for a slow one fill the budget."""
+    from worker.defense import evaluate
+
+    size, budget = 100, 300
+    files = [{"object_key": f"k{i}"} for i in range(20)]
+    peak = [0]
+
+    async def fake_load(key):
+        return b"x" * size
+
+    async def scenario():
+        loader = evaluate._SampleLoader(files, consumers=2, max_bytes=budget)
+
+        async def consume(delay):
+            for i in range(len(files)):
+                await loader.load(i)
+                peak[0] = max(peak[0], loader._held)
+                await asyncio.sleep(delay)
+            await loader.leave(len(files))
+
+        await asyncio.gather(consume(0), consume(0.001))
+        assert loader._held == 0
+        assert not loader._tasks
+
+    with patch.object(evaluate, "_load_sample", fake_load):
+        _run(scenario())
+
+    # The file being read and the prefetched one can land on top of the budget.
+    assert budget <= peak[0] <= budget + 2 * size
+
+
+def test_sample_loader_leave_releases_dropped_consumer():
+    """Samples stop being held for a consumer that leaves early."""
+    from worker.defense import evaluate
+
+    async def fake_load(key):
+        return b"x" * 100
+
+    files = [{"object_key": f"k{i}"} for i in range(5)]
+
+    async def scenario():
+        loader = evaluate._SampleLoader(files, consumers=2, max_bytes=100)
+        await loader.load(0)
+        await loader.leave(1)
+        for i in range(len(files)):
+            await asyncio.wait_for(loader.load(i), timeout=1)
+        assert loader._held == 0
+
+    with patch.object(evaluate, "_load_sample", fake_load):
+        _run(scenario())
+
+
+# ---------------------------------------------------------------------------
+# Heartbeat during an attack
+# ---------------------------------------------------------------------------
+
+def test_heartbeat_runs_while_attack_is_evaluated():
+    """The worker keeps heartbeating until the attack's evaluation finishes."""
+    from worker.defense import evaluate
+
+    registry = MagicMock()
+
+    async def scenario():
+        task = asyncio.create_task(evaluate._heartbeat_until_cancelled(registry, "worker-1"))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    with patch.object(evaluate, "HEARTBEAT_INTERVAL_SECONDS", 0.001):
+        _run(scenario())
+
+    assert registry.heartbeat.call_count >= 2
+    registry.heartbeat.assert_called_with("worker-1")
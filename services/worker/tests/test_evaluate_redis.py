@@ -3,6 +3,7 @@
 from __future__ import annotations
 
 import asyncio
+import json
 from unittest.mock import AsyncMock, MagicMock, Mock, patch
 
 import pytest
@@ -11,6 +12,7 @@ import requests as requests_lib
 from worker.defense.evaluate import (
     ContainerRestartError,
     EvalOutcome,
+    _SESSION,
     evaluate_defense_with_redis,
     evaluate_defenses_async,
 )
@@ -31,7 +33,7 @@ def make_pop_attack_sequence(*attacks):
     call_count = [0]
     attack_list = list(attacks)
 
-    def pop_next_attack(self, worker_id):
+    def pop_next_attack(self, worker_id, timeout=1):
         if call_count[0] < len(attack_list):
             result = attack_list[call_count[0]]
             call_count[0] += 1
@@ -46,7 +48,7 @@ def make_pop_attack_sequence(*attacks):
 def _make_ok_response(result: int = 1) -> MagicMock:
     resp = MagicMock(spec=requests_lib.Response)
     resp.status_code = 200
-    resp.json.return_value = {"result": result}
+    resp.content = json.dumps({"result": result}).encode()
     return resp
 
 
@@ -85,8 +87,8 @@ def test_evaluate_polls_redis_queue(db_session, fake_redis, test_helpers, monkey
     pop_calls = []
     original_pop = registry.pop_next_attack
 
-    def tracked_pop(self, wid):
-        result = original_pop(wid)
+    def tracked_pop(self, wid, timeout=1):
+        result = original_pop(wid, timeout)
         pop_calls.append(result)
         # After 2 attacks, return None to break loop
         if len(pop_calls) >= 2:
@@ -104,10 +106,10 @@ def test_evaluate_polls_redis_queue(db_session, fake_redis, test_helpers, monkey
 
     monkeypatch.setattr("worker.defense.evaluate.get_sample_path", _fake_get_sample_path)
 
-    # Mock requests.post (sync - called via asyncio.to_thread)
-    monkeypatch.setattr("worker.defense.evaluate.requests.post",
+    # Mock _SESSION.post (sync - called via asyncio.to_thread)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post",
                         lambda url, data=None, headers=None, timeout=None: _make_ok_response())
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     # Skip real sleeps between empty polls
     async def instant_sleep(seconds):
@@ -164,9 +166,9 @@ def test_evaluate_downloads_from_minio(db_session, fake_redis, test_helpers, mon
 
     monkeypatch.setattr("worker.defense.evaluate.get_sample_path", fake_get_sample_path)
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post",
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post",
                         lambda url, data=None, headers=None, timeout=None: _make_ok_response())
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -242,7 +244,7 @@ def test_evaluate_sends_to_gateway(db_session, fake_redis, test_helpers, monkeyp
 
     monkeypatch.setattr("worker.defense.evaluate.get_sample_path", _fake_get_sample_path_gw)
 
-    # Track requests.post calls
+    # Track _SESSION.post calls
     http_requests = []
 
     def fake_post(url, data=None, headers=None, timeout=None):
@@ -253,8 +255,8 @@ def test_evaluate_sends_to_gateway(db_session, fake_redis, test_helpers, monkeyp
         })
         return _make_ok_response()
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post", fake_post)
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", fake_post)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -299,7 +301,7 @@ def test_evaluate_sends_to_gateway(db_session, fake_redis, test_helpers, monkeyp
     assert len(http_requests) == 1
     req = http_requests[0]
     assert req["content"] == sample_bytes
-    assert req["headers"]["Content-Type"] == "application/octet-stream"
+    assert _SESSION.headers["Content-Type"] == "application/octet-stream"
 
 
 def test_evaluate_records_results(db_session, fake_redis, test_helpers, monkeypatch, config_dict, tmp_path):
@@ -338,8 +340,8 @@ def test_evaluate_records_results(db_session, fake_redis, test_helpers, monkeypa
         http_call_count[0] += 1
         return _make_ok_response(result)
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post", fake_post)
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", fake_post)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -403,7 +405,7 @@ def test_evaluate_records_results(db_session, fake_redis, test_helpers, monkeypa
 
 
 def test_evaluate_updates_heartbeat(db_session, fake_redis, test_helpers, monkeypatch, config_dict, tmp_path):
-    """Test evaluation updates heartbeat after processing each attack."""
+    """Test evaluation updates heartbeat after each attack and on idle polls."""
     from worker.redis_client import WorkerRegistry
 
     def fake_init(self):
@@ -431,6 +433,13 @@ def test_evaluate_updates_heartbeat(db_session, fake_redis, test_helpers, monkey
 
     monkeypatch.setattr(WorkerRegistry, "heartbeat", fake_heartbeat)
 
+    # The periodic in-attack heartbeat is covered in test_evaluate_core; with
+    # asyncio.sleep made instant below it would otherwise spin.
+    async def no_periodic_heartbeat(registry, wid):
+        pass
+
+    monkeypatch.setattr("worker.defense.evaluate._heartbeat_until_cancelled", no_periodic_heartbeat)
+
     fake_sample = tmp_path / "sample.exe"
     fake_sample.write_bytes(b"sample")
 
@@ -439,9 +448,9 @@ def test_evaluate_updates_heartbeat(db_session, fake_redis, test_helpers, monkey
 
     monkeypatch.setattr("worker.defense.evaluate.get_sample_path", _fake_get_sample_path_hb)
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post",
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post",
                         lambda url, data=None, headers=None, timeout=None: _make_ok_response())
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -483,7 +492,8 @@ def test_evaluate_updates_heartbeat(db_session, fake_redis, test_helpers, monkey
     finally:
         loop.close()
 
-    assert len(heartbeat_calls) == 2
+    # One per attack, plus one per empty poll before the third closes the queue
+    assert len(heartbeat_calls) == 4
     assert all(wid == worker_id for wid in heartbeat_calls)
 
 
@@ -594,8 +604,8 @@ def test_evaluate_handles_gateway_timeout(db_session, fake_redis, test_helpers,
     def fake_post_timeout(url, data=None, headers=None, timeout=None):
         raise requests_lib.exceptions.Timeout("Request timed out")
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post", fake_post_timeout)
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", fake_post_timeout)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -684,11 +694,11 @@ def test_evaluate_handles_invalid_response(db_session, fake_redis, test_helpers,
     def fake_post_invalid(url, data=None, headers=None, timeout=None):
         resp = MagicMock(spec=requests_lib.Response)
         resp.status_code = 200
-        resp.json.return_value = {"result": 99}
+        resp.content = json.dumps({"result": 99}).encode()
         return resp
 
-    monkeypatch.setattr("worker.defense.evaluate.requests.post", fake_post_invalid)
-    monkeypatch.setattr("worker.defense.evaluate.requests.get", _fake_requests_get)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.post", fake_post_invalid)
+    monkeypatch.setattr("worker.defense.evaluate._SESSION.get", _fake_requests_get)
 
     eval_cfg = EvaluationConfig(
         defense_max_time=5000,
@@ -945,3 +955,134 @@ def test_container_restart_error_removes_defense_from_batch(
             )
         finally:
             loop.close()
+
+
+def test_slow_defense_does_not_hold_back_others(
+    db_session, fake_redis, test_helpers, monkeypatch, config_dict, tmp_path
+):
+    """Each defense works through an attack's files independently, so a fast
+    defense can finish every file while a slow one is still on the first."""
+    from worker.redis_client import WorkerRegistry
+
+    def fake_init(self):
+        self.client = fake_redis
+
+    monkeypatch.setattr(WorkerRegistry, "__init__", fake_init)
+
+    fast_id = test_helpers.create_defense(
+        source_type="docker", docker_image="user/fast:latest"
+    )
+    slow_id = test_helpers.create_defense(
+        source_type="docker", docker_image="user/slow:latest"
+    )
+    attack_id = test_helpers.create_attack(file_count=3)
+
+    worker_id = "test_worker_independent"
+    monkeypatch.setattr(
+        WorkerRegistry,
+        "pop_next_attack",
+        make_pop_attack_sequence(attack_id),
+    )
+
+    fake_sample = tmp_path / "sample.exe"
+    fake_sample.write_bytes(b"MZ" + b"\x00" * 64)
+
+    async def _fake_get_sample_path(key):
+        return fake_sample
+
+    monkeypatch.setattr(
+        "worker.defense.evaluate.get_sample_path", _fake_get_sample_path
+    )
+
+    fast_ctx = {
+        "defense_submission_id": fast_id,
+        "url": "http://fast:8080/",
+        "container_name": "fast-container",
+        "docker_client": MagicMock(),
+    }
+    slow_ctx = {
+        "defense_submission_id": slow_id,
+        "url": "http://slow:8080/",
+        "container_name": "slow-container",
+        "docker_client": MagicMock(),
+    }
+
+    order = []
+    fast_done = asyncio.Event()
+
+    async def fake_evaluate(**kwargs):
+        if kwargs["container_url"] == slow_ctx["url"]:
+            await asyncio.wait_for(fast_done.wait(), timeout=5)
+        order.append((kwargs["container_url"], kwargs["file_index"]))
+        if sum(1 for url, _ in order if url == fast_ctx["url"]) == 3:
+            fast_done.set()
+        return EvalOutcome(model_output=1, evaded_reason=None, duration_ms=5)
+
+    with patch(
+        "worker.defense.evaluate.evaluate_sample_against_container",
+        new=fake_evaluate,
+    ):
+        asyncio.run(
+            evaluate_defenses_async(worker_id, [fast_ctx, slow_ctx], config_dict)
+        )
+
+    assert order[:3] == [(fast_ctx["url"], i) for i in range(3)]
+    assert sorted(order[3:]) == [(slow_ctx["url"], i) for i in range(3)]
+
+
+def test_initial_attacks_evaluated_before_polling(
+    db_session, fake_redis, test_helpers, monkeypatch, config_dict, tmp_path
+):
+    """Attacks passed as initial_attacks are evaluated without a queue pop."""
+    from worker.redis_client import WorkerRegistry
+
+    def fake_init(self):
+        self.client = fake_redis
+
+    monkeypatch.setattr(WorkerRegistry, "__init__", fake_init)
+
+    defense_id = test_helpers.create_defense(
+        source_type="docker", docker_image="user/def:latest"
+    )
+    attack_id = test_helpers.create_attack(file_count=1)
+
+    popped = []
+
+    def empty_pop(self, worker_id, timeout=1):
+        popped.append(worker_id)
+        return None
+
+    monkeypatch.setattr(WorkerRegistry, "pop_next_attack", empty_pop)
+
+    fake_sample = tmp_path / "sample.exe"
+    fake_sample.write_bytes(b"MZ" + b"\x00" * 64)
+
+    async def _fake_get_sample_path(key):
+        return fake_sample
+
+    monkeypatch.setattr(
+        "worker.defense.evaluate.get_sample_path", _fake_get_sample_path
+    )
+
+    ctx = {
+        "defense_submission_id": defense_id,
+        "url": "http://defense:8080/",
+        "container_name": "def-container",
+        "docker_client": MagicMock(),
+    }
+    outcome = EvalOutcome(model_output=1, evaded_reason=None, duration_ms=5)
+    evaluate_mock = AsyncMock(return_value=outcome)
+
+    with patch(
+        "worker.defense.evaluate.evaluate_sample_against_container",
+        new=evaluate_mock,
+    ):
+        asyncio.run(
+            evaluate_defenses_async(
+                "test_worker_initial", [ctx], config_dict, initial_attacks=[attack_id]
+            )
+        )
+
+    assert evaluate_mock.call_count == 1
+    # Only the empty polls that end the loop reach Redis.
+    assert len(popped) == config_dict["defense"]["evaluation"].get("max_empty_polls", 3)
@@ -66,8 +66,7 @@ def test_build_clones_with_branch(config_dict):
         dockerfile.exists.return_value = True
         mock_path.return_value.__truediv__ = lambda self, other: dockerfile
 
-        mock_image = MagicMock()
-        mock_docker.from_env.return_value.images.build.return_value = (mock_image, [])
+        mock_docker.from_env.return_value.api.build.return_value = (chunk for chunk in [{"aux": {"ID": "sha256:abc123"}}])
 
         build_from_github_repo(
             "https://github.com/user/repo/tree/my-branch",
@@ -97,8 +96,7 @@ def test_build_clones_without_branch(config_dict):
         dockerfile.exists.return_value = True
         mock_path.return_value.__truediv__ = lambda self, other: dockerfile
 
-        mock_image = MagicMock()
-        mock_docker.from_env.return_value.images.build.return_value = (mock_image, [])
+        mock_docker.from_env.return_value.api.build.return_value = (chunk for chunk in [{"aux": {"ID": "sha256:abc123"}}])
 
         build_from_github_repo(
             "https://github.com/user/repo",
@@ -111,6 +109,37 @@ def test_build_clones_without_branch(config_dict):
     assert "branch" not in call_kwargs[1]
 
 
+def test_build_timeout_closes_build_stream(config_dict):
+    """A build that outlives max_build_time_seconds is stopped, not abandoned."""
+    closed = []
+
+    def build_stream():
+        try:
+            while True:
+                yield {"stream": "still building\n"}
+        finally:
+            closed.append(True)
+
+    config_dict.setdefault('defense', {}).setdefault('build', {})['max_build_time_seconds'] = 0
+
+    with patch("worker.defense.github_handler.git") as mock_git, \
+         patch("worker.defense.github_handler.validate_dockerfile_safety"), \
+         patch("worker.defense.github_handler.validate_build_context"), \
+         patch("worker.defense.github_handler.Path") as mock_path, \
+         patch("worker.defense.github_handler.docker.from_env") as mock_from_env:
+
+        mock_git.GitCommandError = Exception
+        dockerfile = MagicMock()
+        dockerfile.exists.return_value = True
+        mock_path.return_value.__truediv__ = lambda self, other: dockerfile
+        mock_from_env.return_value.api.build.return_value = build_stream()
+
+        with pytest.raises(ValueError, match="timed out"):
+            build_from_github_repo("https://github.com/user/repo", 12345, config_dict)
+
+    assert closed == [True]
+
+
 @pytest.mark.manual
 def test_build_from_real_github_repo(config_dict):
     """Test building image from actual GitHub repo: gmgrahamgm/good_defense."""
@@ -142,6 +142,61 @@ def test_heartbeat(fake_redis, monkeypatch):
     assert new_heartbeat > old_heartbeat
 
 
+def test_heartbeat_refreshes_metadata_ttl(fake_redis, monkeypatch):
+    """Test register and heartbeat keep a TTL on worker metadata."""
+    from worker.redis_client import WORKER_METADATA_TTL
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    key = "worker:test_worker_1:metadata"
+    registry.register("test_worker_1", ["def-123"], "job-456")
+    assert key in fake_redis.expiry
+
+    fake_redis.expiry[key] = time.time() + 1
+    registry.add_attack_to_queue("test_worker_1", "attack-1")
+    queue_key = "worker:test_worker_1:attacks"
+    fake_redis.expiry[queue_key] = time.time() + 1
+    registry.heartbeat("test_worker_1")
+
+    assert fake_redis.expiry[key] > time.time() + WORKER_METADATA_TTL - 5
+    assert fake_redis.expiry[queue_key] > time.time() + WORKER_METADATA_TTL - 5
+
+
+def test_heartbeat_does_not_recreate_expired_metadata(fake_redis, monkeypatch):
+    """Test a heartbeat after the metadata expired leaves the worker gone."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a"], "job-1")
+    fake_redis.expiry["worker:worker-1:metadata"] = time.time() - 1
+
+    registry.heartbeat("worker-1")
+
+    assert not fake_redis.exists("worker:worker-1:metadata")
+    assert registry.get_open_workers_for_defense("def-a") == []
+
+
+def test_stale_worker_expires_from_open_index(fake_redis, monkeypatch):
+    """Test a worker that stops heartbeating is no longer offered attacks."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a"], "job-1")
+    registry.add_attack_to_queues(["worker-1"], "attack-1")
+    assert registry.get_open_workers_for_defense("def-a") == ["worker-1"]
+
+    # No heartbeat for longer than the TTL: the worker's keys expire
+    for key in ("worker:worker-1:metadata", "worker:worker-1:attacks"):
+        fake_redis.expiry[key] = time.time() - 1
+
+    assert registry.get_open_workers_for_defense("def-a") == []
+    assert not fake_redis.exists("workers:open:def-a")
+    assert not fake_redis.exists("worker:worker-1:attacks")
+
+
 def test_unregister(fake_redis, monkeypatch):
     """Test unregister cleans up worker data."""
     monkeypatch.setattr(
@@ -178,32 +233,17 @@ def test_get_open_workers_for_defense(fake_redis, monkeypatch):
 
     # Create multiple workers with different states
     # Worker 1: Target defense, OPEN
-    fake_redis.sadd("workers:active", "worker-1")
-    fake_redis.hset("worker:worker-1:metadata", mapping={
-        "defense_submission_ids": target_defense,
-        "queue_state": "OPEN"
-    })
+    registry.register("worker-1", [target_defense], "job-1")
 
     # Worker 2: Target defense, CLOSED
-    fake_redis.sadd("workers:active", "worker-2")
-    fake_redis.hset("worker:worker-2:metadata", mapping={
-        "defense_submission_ids": target_defense,
-        "queue_state": "CLOSED"
-    })
+    registry.register("worker-2", [target_defense], "job-2")
+    registry.close_queue("worker-2")
 
     # Worker 3: Other defense, OPEN
-    fake_redis.sadd("workers:active", "worker-3")
-    fake_redis.hset("worker:worker-3:metadata", mapping={
-        "defense_submission_ids": other_defense,
-        "queue_state": "OPEN"
-    })
+    registry.register("worker-3", [other_defense], "job-3")
 
     # Worker 4: Target defense, OPEN
-    fake_redis.sadd("workers:active", "worker-4")
-    fake_redis.hset("worker:worker-4:metadata", mapping={
-        "defense_submission_ids": target_defense,
-        "queue_state": "OPEN"
-    })
+    registry.register("worker-4", [target_defense], "job-4")
 
     # Get open workers for target defense
     open_workers = registry.get_open_workers_for_defense(target_defense)
@@ -216,6 +256,21 @@ def test_get_open_workers_for_defense(fake_redis, monkeypatch):
     assert "worker-3" not in open_workers  # Different defense
 
 
+def test_get_open_workers_after_unregister(fake_redis, monkeypatch):
+    """Test unregistered workers are dropped from the open index."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a", "def-b"], "job-1")
+    registry.register("worker-2", ["def-a"], "job-2")
+
+    registry.unregister("worker-1")
+
+    assert registry.get_open_workers_for_defense("def-a") == ["worker-2"]
+    assert registry.get_open_workers_for_defense("def-b") == []
+
+
 def test_get_open_workers_empty(fake_redis, monkeypatch):
     """Test finding open workers when none exist."""
     monkeypatch.setattr(
@@ -270,6 +325,26 @@ def test_mark_evaluation_queued_duplicate(fake_redis, monkeypatch):
     assert second_result is False
 
 
+def test_mark_evaluations_queued_returns_open_workers_of_claimed(fake_redis, monkeypatch):
+    """Test bulk marking skips already-queued pairs and returns open workers."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a"], "job-1")
+    registry.mark_evaluation_queued("def-b", "attack-456", "job-0")
+
+    claimed = registry.mark_evaluations_queued(
+        {"def-a": "job-a", "def-b": "job-b", "def-c": "job-c"}, "attack-456")
+
+    assert claimed == {"def-a": ["worker-1"], "def-c": []}
+    assert fake_redis.data.get("evaluations:queued:def-a:attack-456") == "job-a"
+    assert fake_redis.data.get("evaluations:queued:def-b:attack-456") == "job-0"
+
+    registry.add_attack_to_queues(claimed["def-a"], "attack-456")
+    assert fake_redis.lrange("worker:worker-1:attacks", 0, -1) == [b"attack-456"]
+
+
 def test_mark_evaluation_queued_ttl(fake_redis, monkeypatch):
     """Test marking evaluation sets 24h TTL."""
     import time
@@ -315,3 +390,36 @@ def test_multiple_workers_concurrent_registration(fake_redis, monkeypatch):
     for worker_id in worker_ids:
         assert worker_id in active_workers
         assert fake_redis.exists(f"worker:{worker_id}:metadata")
+
+
+def test_get_open_workers_skips_expired_metadata(fake_redis, monkeypatch):
+    """Test workers whose metadata expired are dropped from the open index."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a"], "job-1")
+    registry.register("worker-2", ["def-a"], "job-2")
+    fake_redis.expiry["worker:worker-1:metadata"] = time.time() - 1
+
+    assert registry.get_open_workers_for_defense("def-a") == ["worker-2"]
+    assert fake_redis.smembers("workers:open:def-a") == {"worker-2"}
+    assert registry.mark_evaluations_queued(
+        {"def-a": "job-a"}, "attack-1") == {"def-a": ["worker-2"]}
+
+
+def test_close_and_unregister_after_metadata_expired(fake_redis, monkeypatch):
+    """Test explicit defense IDs clean the open index once metadata is gone."""
+    monkeypatch.setattr(
+        "worker.redis_client.get_redis_client", lambda: fake_redis)
+
+    registry = WorkerRegistry()
+    registry.register("worker-1", ["def-a", "def-b"], "job-1")
+    fake_redis.delete("worker:worker-1:metadata")
+
+    registry.close_queue("worker-1", ["def-a"])
+    assert not fake_redis.exists("worker:worker-1:metadata")
+    assert "worker-1" not in fake_redis.smembers("workers:open:def-a")
+
+    registry.unregister("worker-1", ["def-a", "def-b"])
+    assert "worker-1" not in fake_redis.smembers("workers:open:def-b")
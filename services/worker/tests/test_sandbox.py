@@ -161,6 +161,7 @@ def _mock_response(status_code: int, text: str = "") -> MagicMock:
     r.status_code = status_code
     r.ok = status_code < 400
     r.text = text
+    r.content = text.encode()
     return r
 
 
@@ -179,6 +180,12 @@ def test_raise_for_vt_error_500():
         _raise_for_vt_error(_mock_response(500, "internal error"), context="test")
 
 
+def test_raise_for_vt_error_truncates_body():
+    with pytest.raises(SandboxUnavailableError) as exc_info:
+        _raise_for_vt_error(_mock_response(502, "x" * 10_000), context="test")
+    assert str(exc_info.value).endswith(": " + "x" * 200)
+
+
 def test_raise_for_vt_error_200_passes():
     _raise_for_vt_error(_mock_response(200), context="test")  # no exception
 
@@ -5,8 +5,11 @@ from __future__ import annotations
 import pytest
 import docker
 import random
+import warnings
+import zipfile
 
-from worker.defense.zip_handler import build_from_zip_archive
+from worker.defense import validation, zip_handler
+from worker.defense.zip_handler import _extract_zip_safely, _is_unsafe_member, build_from_zip_archive
 
 
 def test_build_from_real_zip_file(config_dict, mock_minio_client, defense_zip_file):
@@ -198,3 +201,117 @@ def test_missing_zip_file(config_dict, mock_minio_client):
     error_msg = str(exc_info.value).lower()
     assert "not found" in error_msg or "exist" in error_msg or "object" in error_msg
     print(f"✓ Missing ZIP correctly raised error: {exc_info.value}")
+
+
+def _write_zip(path, entries):
+    with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries.items():
+            zf.writestr(name, data)
+    return str(path)
+
+
+def test_extract_zip_safely_extracts_nested_entries(tmp_path):
+    """Test that valid archives are extracted with their directory layout."""
+    zip_path = _write_zip(tmp_path / "ok.zip", {
+        "defense/Dockerfile": "FROM python:3.11-slim\n",
+        "defense/app/main.py": "print('hi')\n",
+    })
+    out = tmp_path / "out"
+    out.mkdir()
+
+    _extract_zip_safely(zip_path, str(out))
+
+    assert (out / "defense" / "Dockerfile").read_text() == "FROM python:3.11-slim\n"
+    assert (out / "defense" / "app" / "main.py").read_text() == "print('hi')\n"
+
+
+def test_extract_zip_safely_rejects_path_traversal(tmp_path):
+    """Test that entries escaping the extraction directory are rejected."""
+    zip_path = _write_zip(tmp_path / "evil.zip", {"../evil.sh": "rm -rf /\n"})
+    out = tmp_path / "out"
+    out.mkdir()
+
+    with pytest.raises(ValueError, match="path traversal"):
+        _extract_zip_safely(zip_path, str(out))
+
+    assert not (tmp_path / "evil.sh").exists()
+
+
+@pytest.mark.parametrize("member,unsafe", [
+    ("defense/app/main.py", False),
+    ("defense/", False),
+    ("./defense/Dockerfile", False),
+    ("../evil.sh", True),
+    ("defense/../../evil.sh", True),
+    ("defense\\..\\evil.sh", True),
+    ("/etc/passwd", True),
+    ("\\evil.sh", True),
+    ("C:/evil.sh", True),
+])
+def test_is_unsafe_member(member, unsafe):
+    """Test the archive member path traversal check."""
+    assert _is_unsafe_member(member) is unsafe
+
+
+def test_extract_zip_safely_rejects_too_many_files(tmp_path, monkeypatch):
+    """Test that the file count limit is enforced."""
+    monkeypatch.setattr(zip_handler, "MAX_FILE_COUNT", 2)
+    zip_path = _write_zip(tmp_path / "many.zip", {f"f{i}.txt": "x" for i in range(3)})
+    out = tmp_path / "out"
+    out.mkdir()
+
+    with pytest.raises(ValueError, match="too many files"):
+        _extract_zip_safely(zip_path, str(out))
+
+    assert list(out.iterdir()) == []
+
+
+def test_validate_build_context_reports_running_totals(tmp_path, monkeypatch):
+    """Test limit errors say how far the walk got when the limit was crossed."""
+    for i in range(3):
+        (tmp_path / f"f{i}.txt").write_bytes(b"x" * 1024)
+
+    monkeypatch.setattr(validation, "MAX_FILE_COUNT", 2)
+    with pytest.raises(ValueError, match=r"too many files: at least 3 \(max: 2\)"):
+        validation.validate_build_context(tmp_path, {})
+
+    monkeypatch.setattr(validation, "MAX_FILE_COUNT", 50000)
+    monkeypatch.setattr(validation, "MAX_CONTEXT_SIZE_MB", 0)
+    with pytest.raises(ValueError, match=r"too large: at least 0\.00 MB \(max: 0 MB\)"):
+        validation.validate_build_context(tmp_path, {})
+
+
+def test_validate_build_context_rejects_unreadable_directory(tmp_path, monkeypatch):
+    """Test that an unreadable subdirectory fails validation with a clear error."""
+    import os
+
+    (tmp_path / "locked").mkdir()
+    (tmp_path / "Dockerfile").write_text("FROM scratch\n")
+    scandir = os.scandir
+
+    def guarded_scandir(path):
+        if os.path.basename(path) == "locked":
+            raise PermissionError(13, "Permission denied", path)
+        return scandir(path)
+
+    monkeypatch.setattr(validation.os, "scandir", guarded_scandir)
+    with pytest.raises(ValueError, match="Cannot read build context directory .*locked"):
+        validation.validate_build_context(tmp_path, {})
+
+
+@pytest.mark.parametrize("second", ["defense/Dockerfile", "./defense//Dockerfile"])
+def test_extract_zip_safely_rejects_duplicate_members(tmp_path, second):
+    """Test that repeated member names are rejected instead of racing on disk."""
+    zip_path = tmp_path / "dup.zip"
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # zipfile warns when writing a repeated name
+        with zipfile.ZipFile(zip_path, 'w') as zf:
+            zf.writestr("defense/Dockerfile", "FROM python:3.11-slim\n")
+            zf.writestr(second, "FROM evil\n")
+    out = tmp_path / "out"
+    out.mkdir()
+
+    with pytest.raises(ValueError, match="Duplicate path"):
+        _extract_zip_safely(str(zip_path), str(out))
+
+    assert list(out.iterdir()) == []
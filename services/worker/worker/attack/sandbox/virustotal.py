@@ -256,5 +256,5 @@ def _raise_for_vt_error(response: requests.Response, context: str) -> None:
     if not response.ok:
         raise SandboxUnavailableError(
             f"VirusTotal returned HTTP {response.status_code} during {context}: "
-            f"{response.text[:200]}"
+            f"{response.content[:200].decode('utf-8', 'replace')}"
         )
@@ -2,6 +2,7 @@
 
 from __future__ import annotations
 
+import mmap
 import os
 import shutil
 import uuid
@@ -19,6 +20,21 @@ logger = logging.getLogger(__name__)
 CACHE_DIR = Path(os.getenv("CACHE_DIR", "/app/cache"))
 
 
+def read_sample(local_path: str | Path) -> bytes | memoryview:
+    """Map a cached sample read-only instead of copying it onto the heap.
+
+    The mapping stays valid after the file is closed and is released once the
+    last view is dropped, so every reader of a sample (evaluation and
+    heuristic validation alike) shares the same page-cache pages.
+    """
+    with open(local_path, "rb") as f:
+        try:
+            return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except ValueError:
+            # Empty files cannot be mapped.
+            return b""
+
+
 async def get_sample_path(object_key: str) -> Path:
     """
     Get local path for a given sample, downloads from MinIO if not cached.
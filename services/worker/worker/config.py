@@ -24,7 +24,10 @@ class EvaluationConfig(BaseModel):
     requests_timeout_seconds: int = 5
     batch_size: int = 4
     max_empty_polls: int = 3       # consecutive empty queue polls before the worker shuts down
+    queue_poll_timeout: int = Field(default=2, ge=1)  # seconds each blocking queue poll waits
     stats_sampling_rate: int = 10
+    request_retries: int = Field(default=0, ge=0)  # gateway retries on connect errors / 502-504 (0 = fail fast)
+    sample_prefetch_mb: int = Field(default=64, ge=0)  # samples held ahead of the slowest defense
 
     defense_max_ram: int = 1024      # MB - sample marked evaded and container restarted if exceeded
     defense_max_time: int = 5000     # ms - per-sample time limit; exceeded = evaded
@@ -63,7 +66,8 @@ class BuildConfig(BaseModel):
 
     use_buildkit: bool = True
     network_disabled: bool = True
-    no_cache: bool = True
+    no_cache: bool = False
+    cache_from: list[str] = Field(default_factory=list)  # images to reuse layers from; empty = local cache only
     build_cpu_quota: int = 100000
     max_dockerfile_size_kb: int = 100
 
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import io
 import os
+from contextlib import contextmanager
 from functools import lru_cache
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Iterator
 
 if TYPE_CHECKING:
-    from sqlalchemy.engine import Engine
+    from sqlalchemy.engine import Connection, Engine
 
 
 @lru_cache(maxsize=1)
@@ -17,6 +19,29 @@ def get_engine() -> Engine:
     return create_engine(database_url, pool_pre_ping=True)
 
 
+@contextmanager
+def eval_session() -> Iterator[Connection]:
+    """Hold one connection and transaction open for a batch of evaluation writes.
+
+    Helpers that accept a ``conn`` argument write through it instead of opening
+    their own transaction, so a whole attack commits once. Each such write runs
+    in its own SAVEPOINT, so a failed write is rolled back alone and does not
+    abort the writes around it.
+    """
+    with get_engine().begin() as conn:
+        yield conn
+
+
+@contextmanager
+def _begin(conn: Connection | None) -> Iterator[Connection]:
+    if conn is not None:
+        with conn.begin_nested():
+            yield conn
+        return
+    with get_engine().begin() as new_conn:
+        yield new_conn
+
+
 def set_job_status(*, job_id: str, status: str, error: str | None = None) -> None:
     from sqlalchemy import text
     engine = get_engine()
@@ -40,7 +65,7 @@ def set_job_status(*, job_id: str, status: str, error: str | None = None) -> Non
                     """
                     UPDATE jobs
                     SET status = :status,
-                        payload = COALESCE(payload, '{}'::jsonb) || jsonb_build_object('error', :error),
+                        payload = jsonb_set(COALESCE(payload, '{}'::jsonb), '{error}', to_jsonb(CAST(:error AS text)), true),
                         updated_at = CURRENT_TIMESTAMP
                     WHERE id = :id
                     """
@@ -78,21 +103,32 @@ def get_defense_docker_image(*, submission_id: str) -> str | None:
         return result
 
 
-def ensure_evaluation_run(*, defense_submission_id: str, attack_submission_id: str) -> str:
+def ensure_evaluation_runs(
+    *,
+    defense_submission_ids: list[str],
+    attack_submission_id: str,
+    conn: Connection | None = None,
+) -> dict[str, str]:
+    """Create one running evaluation run per defense for an attack in a single INSERT.
+
+    Returns a mapping of defense_submission_id to the new evaluation run ID.
+    """
     from sqlalchemy import text
-    engine = get_engine()
-    with engine.begin() as conn:
-        result = conn.execute(
+    if not defense_submission_ids:
+        return {}
+    with _begin(conn) as conn:
+        rows = conn.execute(
             text(
                 """
                 INSERT INTO evaluation_runs (defense_submission_id, attack_submission_id, status)
-                VALUES (:def_id, :atk_id, 'running')
-                RETURNING id
+                SELECT def_id, :atk_id, 'running'
+                FROM unnest(CAST(:def_ids AS uuid[])) AS def_id
+                RETURNING defense_submission_id, id
                 """
             ),
-            {"def_id": defense_submission_id, "atk_id": attack_submission_id},
-        ).scalar()
-        return str(result)
+            {"def_ids": list(defense_submission_ids), "atk_id": attack_submission_id},
+        ).fetchall()
+        return {str(row[0]): str(row[1]) for row in rows}
 
 
 def set_evaluation_run_status(
@@ -119,18 +155,28 @@ def set_evaluation_run_status(
         )
 
 
-def upsert_evaluation(
-    *,
-    evaluation_run_id: str,
-    attack_file_id: str,
-    result: int | None = None,
-    error: str | None = None,
-    duration_ms: int | None = None,
-    evaded_reason: str | None = None,
-) -> None:
+EVALUATION_COPY_MIN_ROWS = 50  # full evaluator batches are loaded with COPY
+
+_EVALUATION_COLUMNS = (
+    "evaluation_run_id", "attack_file_id", "model_output", "error", "duration_ms", "evaded_reason"
+)
+
+
+def insert_evaluations(rows: list[dict], *, conn: Connection | None = None) -> None:
+    """Write several per-file results in one executemany round trip.
+
+    Each row carries evaluation_run_id and attack_file_id plus the optional
+    result, error, duration_ms and evaded_reason keys; missing optional keys
+    default to NULL. Batches of EVALUATION_COPY_MIN_ROWS or
+    more are streamed with COPY instead.
+    """
     from sqlalchemy import text
-    engine = get_engine()
-    with engine.begin() as conn:
+    if not rows:
+        return
+    with _begin(conn) as conn:
+        if len(rows) >= EVALUATION_COPY_MIN_ROWS:
+            _copy_evaluations(conn, rows)
+            return
         conn.execute(
             text(
                 """
@@ -138,15 +184,55 @@ def upsert_evaluation(
                 VALUES (:run_id, :file_id, :out, :err, :dur, :evaded_reason)
                 """
             ),
-            {
-                "run_id": evaluation_run_id,
-                "file_id": attack_file_id,
-                "out": result,
-                "err": error,
-                "dur": duration_ms,
-                "evaded_reason": evaded_reason,
-            }
+            [
+                {
+                    "run_id": row["evaluation_run_id"],
+                    "file_id": row["attack_file_id"],
+                    "out": row.get("result"),
+                    "err": row.get("error"),
+                    "dur": row.get("duration_ms"),
+                    "evaded_reason": row.get("evaded_reason"),
+                }
+                for row in rows
+            ],
+        )
+
+
+def _copy_evaluations(conn: Connection, rows: list[dict]) -> None:
+    """Stream per-file results through COPY ... FROM STDIN in text format."""
+    buf = io.StringIO()
+    for row in rows:
+        buf.write("\t".join((
+            _copy_value(row["evaluation_run_id"]),
+            _copy_value(row["attack_file_id"]),
+            _copy_value(row.get("result")),
+            _copy_value(row.get("error")),
+            _copy_value(row.get("duration_ms")),
+            _copy_value(row.get("evaded_reason")),
+        )))
+        buf.write("\n")
+    buf.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY evaluation_file_results ({', '.join(_EVALUATION_COLUMNS)}) FROM STDIN",
+            buf,
         )
+    finally:
+        cursor.close()
+
+
+def _copy_value(value: object) -> str:
+    """Encode one value for COPY text format, with NULL as \\N."""
+    if value is None:
+        return "\\N"
+    return (
+        str(value)
+        .replace("\\", "\\\\")
+        .replace("\t", "\\t")
+        .replace("\n", "\\n")
+        .replace("\r", "\\r")
+    )
 
 
 def upsert_pair_score(
@@ -254,27 +340,37 @@ def get_defense_submission_source(submission_id: str) -> tuple[str, dict]:
                 f"Invalid source_type for submission {submission_id}: {source_type}")
 
 
-def get_all_validated_defenses() -> list[str]:
+def get_validated_defenses_for_attack(attack_submission_id: str) -> dict[str, bool]:
     """
-    Query all defense submissions that have passed functional validation.
-    Used by attack job to enqueue defenses for evaluation.
+    Query all validated defenses together with their progress on one attack.
+    Used by attack job to decide, in a single query, which defenses to dispatch.
+
+    Args:
+        attack_submission_id: Attack submission UUID
 
     Returns:
-        List of defense submission IDs (UUIDs as strings)
+        Defense submission IDs (UUIDs as strings) mapped to True if an
+        evaluation of the attack is already queued or running
     """
     from sqlalchemy import text
     engine = get_engine()
     with engine.connect() as conn:
         result = conn.execute(
             text("""
-                SELECT s.id FROM submissions s
+                SELECT s.id, EXISTS (
+                    SELECT 1 FROM evaluation_runs er
+                    WHERE er.defense_submission_id = s.id
+                    AND er.attack_submission_id = :atk_id
+                    AND er.status IN ('queued', 'running')
+                ) FROM submissions s
                 JOIN active_submissions asub ON s.id = asub.submission_id
                 WHERE s.submission_type = 'defense'
                 AND s.is_functional = TRUE
                 AND s.deleted_at IS NULL
-            """)
+            """),
+            {"atk_id": attack_submission_id}
         ).fetchall()
-        return [str(row[0]) for row in result]
+        return {str(row[0]): row[1] for row in result}
 
 
 def get_unevaluated_attacks(defense_submission_id: str) -> list[str]:
@@ -489,32 +585,6 @@ def get_attack_files(attack_submission_id: str) -> list[dict]:
         ]
 
 
-def is_evaluation_in_progress(defense_id: str, attack_id: str) -> bool:
-    """
-    Check if defense-attack pair is already running or queued.
-
-    Args:
-        defense_id: Defense submission UUID
-        attack_id: Attack submission UUID
-
-    Returns:
-        True if evaluation is queued or running, False otherwise
-    """
-    from sqlalchemy import text
-    engine = get_engine()
-    with engine.connect() as conn:
-        result = conn.execute(
-            text("""
-                SELECT COUNT(*) FROM evaluation_runs
-                WHERE defense_submission_id = :def_id
-                AND attack_submission_id = :atk_id
-                AND status IN ('queued', 'running')
-            """),
-            {"def_id": defense_id, "atk_id": attack_id}
-        ).scalar()
-        return result > 0
-
-
 def mark_attack_validated(attack_submission_id: str) -> None:
     """
     Mark attack as validated and ready.
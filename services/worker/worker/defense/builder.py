@@ -0,0 +1,92 @@
+"""Docker image builds for defense submissions."""
+
+from __future__ import annotations
+
+import logging
+import re
+import time
+
+import docker
+import requests
+import urllib3
+
+BUILD_LOG_BATCH_LINES = 500
+BUILD_LOG_FLUSH_SECONDS = 1.0
+
+_BUILT_IMAGE_ID = re.compile(r'(^Successfully built |sha256:)([0-9a-f]+)$')
+
+
+def build_image(
+    client: docker.DockerClient,
+    timeout: float,
+    build_logger: logging.Logger,
+    **build_kwargs,
+) -> str:
+    """
+    Build an image through the low-level API, stopping it after timeout seconds.
+
+    The build log is streamed in the calling thread. The deadline is checked
+    between log chunks, and the HTTP read timeout covers builds that go quiet
+    (e.g. ``RUN sleep infinity``). When either fires, the stream is closed.
+    The daemon then cancels the build, so an abandoned build cannot tag the
+    image later.
+
+    Build output is logged to build_logger while the build runs, in batches
+    of BUILD_LOG_BATCH_LINES lines or BUILD_LOG_FLUSH_SECONDS seconds,
+    whichever comes first.
+
+    Returns:
+        The ID of the built image
+
+    Raises:
+        ValueError: If the build runs past its timeout
+        docker.errors.BuildError: If the build log reports an error or
+            finishes without producing an image
+    """
+    deadline = time.monotonic() + timeout
+    log_enabled = build_logger.isEnabledFor(logging.INFO)
+    stream = None
+    logs: list[dict] = []
+    lines: list[str] = []
+    last_flush = time.monotonic()
+    image_id = None
+
+    def flush() -> None:
+        nonlocal last_flush
+        if lines:
+            build_logger.info("\n".join(lines))
+            lines.clear()
+        last_flush = time.monotonic()
+
+    try:
+        stream = client.api.build(decode=True, timeout=timeout, **build_kwargs)
+        for chunk in stream:
+            logs.append(chunk)
+            if 'error' in chunk:
+                raise docker.errors.BuildError(chunk['error'], logs)
+            if 'aux' in chunk and 'ID' in chunk['aux']:
+                image_id = chunk['aux']['ID']
+            line = chunk.get('stream', '').strip()
+            if line:
+                match = _BUILT_IMAGE_ID.search(line)
+                if match:
+                    image_id = match.group(2)
+                if log_enabled:
+                    lines.append(line)
+            if lines and (
+                len(lines) >= BUILD_LOG_BATCH_LINES
+                or time.monotonic() - last_flush >= BUILD_LOG_FLUSH_SECONDS
+            ):
+                flush()
+            if time.monotonic() > deadline:
+                raise ValueError(f"Docker build timed out after {timeout} seconds")
+    except (requests.exceptions.Timeout, urllib3.exceptions.ReadTimeoutError) as e:
+        raise ValueError(f"Docker build timed out after {timeout} seconds") from e
+    finally:
+        flush()
+        if stream is not None:
+            stream.close()
+
+    if image_id is None:
+        raise docker.errors.BuildError("Build finished without producing an image", logs)
+    return image_id
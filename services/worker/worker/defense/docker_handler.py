@@ -3,13 +3,18 @@
 from __future__ import annotations
 
 import re
+from functools import lru_cache
 from urllib.parse import urlparse
 import docker
 from celery.utils.log import get_task_logger
 
 logger = get_task_logger(__name__)
 
+_HUB_REPO_RE = re.compile(r'r/([^/]+/[^/]+)')
+_HUB_OFFICIAL_RE = re.compile(r'_/([^/]+)')
 
+
+@lru_cache(maxsize=256)
 def resolve_image_name(image_reference: str) -> str:
     """
     Parse Docker Hub URL to extract the actual image name.
@@ -34,12 +39,12 @@ def resolve_image_name(image_reference: str) -> str:
     # Handle hub.docker.com URLs
     if parsed.netloc == 'hub.docker.com':
         # User repository: hub.docker.com/r/username/repo
-        match = re.search(r'^r/([^/]+/[^/]+)', path)
+        match = _HUB_REPO_RE.match(path)
         if match:
             return match.group(1)
 
         # Official repository: hub.docker.com/_/repo
-        match = re.search(r'^_/([^/]+)', path)
+        match = _HUB_OFFICIAL_RE.match(path)
         if match:
             return match.group(1)
 
@@ -5,25 +5,34 @@ from __future__ import annotations
 import time
 import asyncio
 import logging
+from collections import deque
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any, Iterable
 
 import docker
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+from urllib3.util.retry import Retry
 
 from worker.config import EvaluationConfig, get_config
 from worker.db import (
-    ensure_evaluation_run,
+    ensure_evaluation_runs,
+    eval_session,
     mark_defense_evaluating,
     mark_defense_evaluated,
     mark_defense_failed,
     set_evaluation_run_status,
-    upsert_evaluation,
+    insert_evaluations,
     upsert_pair_score,
     get_attack_files,
 )
 from worker.redis_client import WorkerRegistry
-from worker.cache_handler import get_sample_path
+from worker.cache_handler import get_sample_path, read_sample
+
+if TYPE_CHECKING:
+    from sqlalchemy.engine import Connection
 
 logger = logging.getLogger(__name__)
 
@@ -40,14 +49,70 @@ class EvalOutcome:
 
 
 _CONTAINER_READY_TIMEOUT = 30  # seconds to wait for container to accept requests after restart
+EVAL_WRITE_BATCH_SIZE = 50  # file results buffered per attack before they are written
+HEARTBEAT_INTERVAL_SECONDS = 60  # heartbeat period while an attack is being evaluated
+
+
+def _build_http_session(retries: int) -> requests.Session:
+    """Create the keep-alive session used to POST samples to the gateway.
+
+    With retries > 0, connection failures and transient gateway errors
+    (502/503/504) are retried inside urllib3 with a short backoff. Read
+    errors are never retried: a timed-out sample must surface as
+    requests.exceptions.Timeout so the per-sample time limit still applies.
+    """
+    max_retries: Retry | int = 0
+    if retries > 0:
+        max_retries = Retry(
+            total=retries,
+            read=False,
+            backoff_factor=0.1,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=None,
+            raise_on_status=False,
+        )
+    session = requests.Session()
+    session.mount("http://", HTTPAdapter(max_retries=max_retries))
+    session.headers["Content-Type"] = "application/octet-stream"
+    return session
+
+
+_SESSION = _build_http_session(get_config().defense.evaluation.request_retries)
+
+
+def _post_sample(url: str, data: bytes | memoryview, timeout: float) -> requests.Response:
+    """POST a sample through the shared session.
+
+    urllib3 already replaces pooled connections that the peer has closed
+    before reusing them. The only failure retried here is one where no
+    connection could be opened at all, so nothing was sent. The retry gets
+    only what is left of timeout. A connection that drops once the sample
+    is in flight is re-raised, since that is how a crashing defense shows up.
+    """
+    started = time.monotonic()
+    try:
+        return _SESSION.post(url, data=data, timeout=timeout)
+    except requests.exceptions.ConnectTimeout:
+        raise
+    except requests.exceptions.ConnectionError as exc:
+        reason = getattr(exc.args[0], "reason", None) if exc.args else None
+        remaining = timeout - (time.monotonic() - started)
+        if not isinstance(reason, NewConnectionError) or remaining <= 0:
+            raise
+        logger.debug("Could not connect to %s (%s); retrying once", url, reason)
+        return _SESSION.post(url, data=data, timeout=remaining)
 
 
 async def _wait_for_container_ready(container_url: str, container_name: str) -> None:
-    """Poll container_url until it responds or the timeout expires."""
+    """Poll container_url until it responds or the timeout expires.
+
+    Probes go through the evaluation session so the connection that answers
+    the readiness check is reused for the samples that follow.
+    """
     start_wait = time.monotonic()
     while (time.monotonic() - start_wait) < _CONTAINER_READY_TIMEOUT:
         try:
-            resp = await asyncio.to_thread(requests.get, container_url, timeout=2)
+            resp = await asyncio.to_thread(_SESSION.get, container_url, timeout=2)
             if resp.status_code != 502:
                 logger.info("Container %s is ready after restart.", container_name)
                 return
@@ -65,7 +130,7 @@ async def evaluate_sample_against_container(
     container_url: str,
     docker_client: docker.DockerClient,
     container_name: str,
-    sample_content: bytes,
+    sample_content: bytes | memoryview,
     eval_cfg: EvaluationConfig,
     restart_count_ref: list[int],
     ctx: dict[str, Any],
@@ -85,7 +150,8 @@ async def evaluate_sample_against_container(
 
     Note: restart handling behavior may change in future iterations.
 
-    Uses requests.post via asyncio.to_thread rather than an async HTTP client.
+    Uses a shared requests.Session via asyncio.to_thread rather than an async HTTP client
+    (see _post_sample for how stale pooled connections are handled).
     This avoids a known issue where async clients interleave sending a large
     request body with reading the response: if the WSGI handler returns before
     consuming the request body, the server closes the connection while the
@@ -97,7 +163,8 @@ async def evaluate_sample_against_container(
         container_url: URL to POST sample bytes to.
         docker_client: Docker SDK client for stats and restart operations.
         container_name: Name of the container to monitor and restart.
-        sample_content: Raw bytes of the sample file.
+        sample_content: Raw bytes of the sample file (bytes or a read-only
+            memoryview over the cached file).
         eval_cfg: Evaluation configuration with resource limits.
         restart_count_ref: Single-element list used as a mutable counter
             shared across calls for the same container.
@@ -112,19 +179,14 @@ async def evaluate_sample_against_container(
         ContainerRestartError: If restart_count_ref[0] exceeds
             eval_cfg.defense_max_restarts.
     """
-    start = time.monotonic()
+    start_ns = time.perf_counter_ns()
     evaded_reason: str | None = None
     model_output: int | None = None
-    headers = {"Content-Type": "application/octet-stream"}
     short_timeout = eval_cfg.defense_max_time / 1000.0
 
     try:
         response = await asyncio.to_thread(
-            requests.post,
-            container_url,
-            data=sample_content,
-            headers=headers,
-            timeout=short_timeout,
+            _post_sample, container_url, sample_content, short_timeout
         )
         should_check_stats = (file_index % eval_cfg.stats_sampling_rate == 0)
 
@@ -166,15 +228,19 @@ async def evaluate_sample_against_container(
 
         if evaded_reason is None:
             if response.status_code == 200:
+                # The gateway always answers with UTF-8 JSON, so parse the raw
+                # body directly instead of going through response.json()'s
+                # encoding detection.
                 try:
-                    result_json = response.json()
-                    raw = result_json.get("result")
-                    if raw in (0, 1):
-                        model_output = raw
-                except Exception as exc:
+                    result_json = orjson.loads(response.content)
+                except orjson.JSONDecodeError as exc:
                     logger.warning(
                         "Failed to parse JSON from %s: %s", container_url, exc
                     )
+                else:
+                    raw = result_json.get("result") if isinstance(result_json, dict) else None
+                    if raw in (0, 1):
+                        model_output = raw
             else:
                 logger.warning(
                     "Container %s returned HTTP %d.",
@@ -196,11 +262,7 @@ async def evaluate_sample_against_container(
         ) / 1000.0
         try:
             await asyncio.to_thread(
-                requests.post,
-                container_url,
-                data=sample_content,
-                headers=headers,
-                timeout=max(extended_timeout, 0.0),
+                _post_sample, container_url, sample_content, max(extended_timeout, 0.0)
             )
         except requests.exceptions.Timeout:
             logger.warning(
@@ -262,7 +324,7 @@ async def evaluate_sample_against_container(
                 restart_exc,
             )
 
-    duration_ms = int((time.monotonic() - start) * 1000)
+    duration_ms = (time.perf_counter_ns() - start_ns) // 1_000_000
     return EvalOutcome(
         model_output=model_output,
         evaded_reason=evaded_reason,
@@ -270,12 +332,142 @@ async def evaluate_sample_against_container(
     )
 
 
+class _ResultBuffer:
+    """Per-attack buffer of file results, written in executemany batches."""
+
+    def __init__(self, conn: Connection, batch_size: int = EVAL_WRITE_BATCH_SIZE):
+        self._conn = conn
+        self._batch_size = batch_size
+        self._rows: list[dict[str, Any]] = []
+
+    def add(self, **row: Any) -> None:
+        self._rows.append(row)
+        if len(self._rows) >= self._batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        """Write the buffered rows, clearing them only once they are written.
+
+        If the batch insert fails, the rows are retried one at a time, each
+        in its own savepoint, so a single bad row cannot block the others.
+        Rows that still fail are logged with their error and dropped.
+        """
+        if not self._rows:
+            return
+        try:
+            insert_evaluations(self._rows, conn=self._conn)
+        except Exception as exc:
+            logger.warning(
+                "Batch write of %d file results failed (%s); retrying row by row",
+                len(self._rows),
+                exc,
+            )
+            for row in self._rows:
+                try:
+                    insert_evaluations([row], conn=self._conn)
+                except Exception as row_exc:
+                    logger.error(
+                        "Failed to write result for file %s of run %s: %s",
+                        row["attack_file_id"],
+                        row["evaluation_run_id"],
+                        row_exc,
+                    )
+        self._rows = []
+
+
+class _SampleLoader:
+    """Shared sample loads for one attack, bounded by the bytes held for slower defenses.
+
+    load(i) returns sample i, reading it on first request, and prefetches
+    file i + 1. A loaded sample counts against max_bytes until every consumer
+    has taken it. A consumer that would start a new file while the budget is
+    used up waits for the slower ones to catch up, so a fast defense cannot
+    pull the whole attack into memory. Consumers call leave() when they stop,
+    so a defense that drops out does not hold samples back.
+    """
+
+    def __init__(self, attack_files: list[dict[str, Any]], consumers: int, max_bytes: int):
+        self._files = attack_files
+        self._consumers = consumers
+        self._max_bytes = max_bytes
+        self._tasks: dict[int, asyncio.Task] = {}
+        self._taken: dict[int, int] = {}
+        self._sizes: dict[int, int] = {}
+        self._held = 0
+        self._budget = asyncio.Condition()
+
+    def _start(self, f_idx: int) -> asyncio.Task:
+        task = self._tasks.get(f_idx)
+        if task is None:
+            task = asyncio.create_task(_load_sample(self._files[f_idx]["object_key"]))
+            task.add_done_callback(lambda t, f_idx=f_idx: self._loaded(f_idx, t))
+            self._tasks[f_idx] = task
+        return task
+
+    def _loaded(self, f_idx: int, task: asyncio.Task) -> None:
+        # Only samples still waiting for a consumer count against the budget.
+        if self._tasks.get(f_idx) is task and not task.cancelled() and task.exception() is None:
+            size = len(task.result())
+            self._sizes[f_idx] = size
+            self._held += size
+
+    def _over_budget(self) -> bool:
+        return self._held > 0 and self._held >= self._max_bytes
+
+    async def _release_taken(self) -> None:
+        released = [
+            f_idx for f_idx in self._tasks if self._taken.get(f_idx, 0) >= self._consumers
+        ]
+        if not released:
+            return
+        for f_idx in released:
+            del self._tasks[f_idx]
+            self._taken.pop(f_idx, None)
+            self._held -= self._sizes.pop(f_idx, 0)
+        async with self._budget:
+            self._budget.notify_all()
+
+    async def load(self, f_idx: int) -> bytes | memoryview:
+        # The take is recorded before the first await, so leave() stays
+        # accurate even if the consumer is cancelled while waiting.
+        self._taken[f_idx] = self._taken.get(f_idx, 0) + 1
+        if f_idx not in self._tasks and self._over_budget():
+            async with self._budget:
+                await self._budget.wait_for(
+                    lambda: f_idx in self._tasks or not self._over_budget()
+                )
+        task = self._start(f_idx)
+        await self._release_taken()
+
+        nxt = f_idx + 1
+        if nxt < len(self._files) and nxt not in self._tasks and not self._over_budget():
+            self._start(nxt)
+        return await task
+
+    async def leave(self, taken: int) -> None:
+        """Stop counting a consumer that took files [0, taken) and will take no more."""
+        self._consumers -= 1
+        for f_idx in self._taken:
+            if f_idx < taken:
+                self._taken[f_idx] -= 1
+        await self._release_taken()
+
+    def cancel(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        self._taken.clear()
+        self._sizes.clear()
+        self._held = 0
+
+
 async def _evaluate_single_sample(
     ctx: dict[str, Any],
-    sample_content: bytes,
+    sample_content: bytes | memoryview,
     run_id: str,
     file_id: str,
     eval_cfg: EvaluationConfig,
+    results: _ResultBuffer,
     file_index: int = 0,
 ) -> None:
     """Evaluate a single sample against a single defense and record result.
@@ -293,7 +485,7 @@ async def _evaluate_single_sample(
         ctx=ctx,
         file_index=file_index,
     )
-    upsert_evaluation(
+    results.add(
         evaluation_run_id=run_id,
         attack_file_id=file_id,
         result=outcome.model_output,
@@ -303,10 +495,85 @@ async def _evaluate_single_sample(
     )
 
 
+async def _evaluate_attack_files(
+    ctx: dict[str, Any],
+    run_id: str,
+    attack_files: list[dict[str, Any]],
+    samples: _SampleLoader,
+    eval_cfg: EvaluationConfig,
+    results: _ResultBuffer,
+) -> None:
+    """Evaluate every file of an attack against one defense, in order.
+
+    samples.load(i) returns the shared load of file i. A failed load is
+    recorded as an error for this defense's run and the file is skipped.
+    ContainerRestartError propagates so the caller can drop the defense;
+    any other per-sample error is logged and evaluation moves on.
+    """
+    taken = 0
+    try:
+        for f_idx, file_info in enumerate(attack_files):
+            file_id = file_info["id"]
+            taken = f_idx + 1
+            try:
+                sample_content = await samples.load(f_idx)
+            except Exception as e:
+                results.add(
+                    evaluation_run_id=run_id,
+                    attack_file_id=file_id,
+                    result=None,
+                    error=f"Cache/MinIO error: {e}",
+                    duration_ms=0,
+                )
+                continue
+
+            try:
+                await _evaluate_single_sample(
+                    ctx=ctx,
+                    sample_content=sample_content,
+                    run_id=run_id,
+                    file_id=file_id,
+                    eval_cfg=eval_cfg,
+                    results=results,
+                    file_index=f_idx,
+                )
+            except ContainerRestartError:
+                raise
+            except Exception as e:
+                logger.error(
+                    "Unexpected error evaluating defense %s: %s",
+                    ctx["defense_submission_id"],
+                    e,
+                )
+    finally:
+        await samples.leave(taken)
+
+
+async def _heartbeat_until_cancelled(registry: WorkerRegistry, worker_id: str) -> None:
+    """Refresh the worker heartbeat every HEARTBEAT_INTERVAL_SECONDS until cancelled.
+
+    Runs alongside an attack's evaluation so a long attack cannot outlive
+    the worker's metadata TTL while its queue is still OPEN.
+    """
+    while True:
+        await asyncio.sleep(HEARTBEAT_INTERVAL_SECONDS)
+        try:
+            await asyncio.to_thread(registry.heartbeat, worker_id)
+        except Exception as exc:
+            logger.warning("Heartbeat for worker %s failed: %s", worker_id, exc)
+
+
+async def _load_sample(object_key: str) -> bytes | memoryview:
+    """Resolve a sample through the local cache and read it off the event loop."""
+    local_path = await get_sample_path(object_key)
+    return await asyncio.to_thread(read_sample, local_path)
+
+
 async def evaluate_defenses_async(
     worker_id: str,
     defense_contexts: list[dict[str, Any]],
     config: dict[str, Any],
+    initial_attacks: Iterable[str] = (),
 ) -> None:
     """Evaluate multiple defense containers against attacks from a shared Redis queue.
 
@@ -315,6 +582,8 @@ async def evaluate_defenses_async(
         defense_contexts: List of defense container contexts. Each entry must
             include defense_submission_id, url, container_name, and docker_client.
         config: Raw configuration dictionary (used for non-typed settings).
+        initial_attacks: Attack IDs known before evaluation starts. They are
+            processed first, before the worker's Redis queue is polled.
     """
     logger.info(
         "Starting async evaluation for %d defenses (Worker: %s)",
@@ -323,6 +592,7 @@ async def evaluate_defenses_async(
     )
 
     registry = WorkerRegistry()
+    registered_ids = [ctx["defense_submission_id"] for ctx in defense_contexts]
     eval_cfg = get_config().defense.evaluation
 
     eval_config = config.get("defense", {}).get("evaluation", {})
@@ -335,102 +605,118 @@ async def evaluate_defenses_async(
     for ctx in defense_contexts:
         ctx.setdefault("restart_count_ref", [0])
     active_contexts = list(defense_contexts)
+    pending_attacks = deque(initial_attacks)
 
     while True:
-        attack_id = registry.pop_next_attack(worker_id)
+        if pending_attacks:
+            attack_id = pending_attacks.popleft()
+        else:
+            # BLPOP already waits server-side for its timeout, so an empty poll
+            # needs no extra sleep; run it in a thread to keep the loop responsive.
+            attack_id = await asyncio.to_thread(
+                registry.pop_next_attack, worker_id, timeout=eval_cfg.queue_poll_timeout
+            )
 
         if attack_id is None:
             empty_poll_count += 1
             if empty_poll_count >= max_empty_polls:
                 logger.info("Queue exhausted after %d empty polls", empty_poll_count)
-                registry.close_queue(worker_id)
+                registry.close_queue(worker_id, registered_ids)
                 break
-            await asyncio.sleep(1)
+            registry.heartbeat(worker_id)
             continue
 
         empty_poll_count = 0
         logger.info("Processing attack %s for batch", attack_id)
 
-        # Ensure evaluation runs exist for all active defenses in batch.
-        runs: list[str] = []
-        for ctx in active_contexts:
-            def_id = ctx["defense_submission_id"]
-            key = (def_id, attack_id)
-            if key not in evaluation_runs:
-                run_id = ensure_evaluation_run(
-                    defense_submission_id=def_id,
-                    attack_submission_id=attack_id,
-                )
-                evaluation_runs[key] = run_id
+        # Ensure evaluation runs exist for all active defenses in batch,
+        # creating the missing ones with a single INSERT.
+        missing = [
+            ctx["defense_submission_id"]
+            for ctx in active_contexts
+            if (ctx["defense_submission_id"], attack_id) not in evaluation_runs
+        ]
+        if missing:
+            created = ensure_evaluation_runs(
+                defense_submission_ids=missing,
+                attack_submission_id=attack_id,
+            )
+            for def_id in missing:
+                evaluation_runs[(def_id, attack_id)] = created[def_id]
                 mark_defense_evaluating(def_id)
-            runs.append(evaluation_runs[key])
-
-        # Process attack files
+        runs = [
+            evaluation_runs[(ctx["defense_submission_id"], attack_id)]
+            for ctx in active_contexts
+        ]
+
+        # Each defense works through the attack's files at its own pace, so a
+        # slow container no longer holds the others back file by file.
+        # Samples are loaded once and shared between defenses.
         attack_files = get_attack_files(attack_id)
-        for f_idx, file_info in enumerate(attack_files):
-            file_id = file_info["id"]
-            object_key = file_info["object_key"]
+        loader = _SampleLoader(
+            attack_files,
+            consumers=len(active_contexts),
+            max_bytes=eval_cfg.sample_prefetch_mb << 20,
+        )
 
+        # All file results for this attack share one transaction so they are
+        # committed together rather than once per sample, and are written in
+        # batches rather than one INSERT per sample. Each batch is its own
+        # savepoint, so a failed batch does not take the others with it.
+        heartbeat = asyncio.create_task(_heartbeat_until_cancelled(registry, worker_id))
+        with eval_session() as conn:
+            buffer = _ResultBuffer(conn)
             try:
-                local_path = await get_sample_path(object_key)
-                with open(local_path, "rb") as f:
-                    sample_content = f.read()
-            except Exception as e:
-                for run_id in runs:
-                    upsert_evaluation(
-                        evaluation_run_id=run_id,
-                        attack_file_id=file_id,
-                        result=None,
-                        error=f"Cache/MinIO error: {e}",
-                        duration_ms=0,
-                    )
-                continue
-
-            # Broadcast to all active defenses concurrently.
-            tasks = [
-                _evaluate_single_sample(
-                    ctx=ctx,
-                    sample_content=sample_content,
-                    run_id=runs[i],
-                    file_id=file_id,
-                    eval_cfg=eval_cfg,
-                    file_index=f_idx,
+                results = await asyncio.gather(
+                    *(
+                        _evaluate_attack_files(
+                            ctx=ctx,
+                            run_id=runs[i],
+                            attack_files=attack_files,
+                            samples=loader,
+                            eval_cfg=eval_cfg,
+                            results=buffer,
+                        )
+                        for i, ctx in enumerate(active_contexts)
+                    ),
+                    return_exceptions=True,
+                )
+            finally:
+                heartbeat.cancel()
+            try:
+                buffer.flush()
+            except Exception as exc:
+                logger.error("Failed to write file results for attack %s: %s", attack_id, exc)
+        loader.cancel()
+
+        # Remove any defense that exhausted its restart budget.
+        failed_indices = []
+        for i, result in enumerate(results):
+            if isinstance(result, ContainerRestartError):
+                ctx = active_contexts[i]
+                error_msg = "Container exceeded maximum restarts during evaluation."
+                logger.error(
+                    "Defense %s exceeded maximum restarts; removing from batch.",
+                    ctx["defense_submission_id"],
+                )
+                set_evaluation_run_status(runs[i], "failed", error=error_msg)
+                mark_defense_failed(ctx["defense_submission_id"], error_msg)
+                failed_indices.append(i)
+            elif isinstance(result, Exception):
+                logger.error(
+                    "Unexpected error evaluating defense %s: %s",
+                    active_contexts[i]["defense_submission_id"],
+                    result,
                 )
-                for i, ctx in enumerate(active_contexts)
-            ]
-
-            results = await asyncio.gather(*tasks, return_exceptions=True)
-
-            # Remove any defense that exhausted its restart budget.
-            failed_indices = []
-            for i, result in enumerate(results):
-                if isinstance(result, ContainerRestartError):
-                    ctx = active_contexts[i]
-                    error_msg = (
-                        "Container exceeded maximum restarts during evaluation."
-                    )
-                    logger.error(
-                        "Defense %s exceeded maximum restarts; removing from batch.",
-                        ctx["defense_submission_id"],
-                    )
-                    set_evaluation_run_status(runs[i], "failed", error=error_msg)
-                    mark_defense_failed(ctx["defense_submission_id"], error_msg)
-                    failed_indices.append(i)
-                elif isinstance(result, Exception):
-                    logger.error(
-                        "Unexpected error evaluating defense %s: %s",
-                        active_contexts[i]["defense_submission_id"],
-                        result,
-                    )
 
-            for i in reversed(failed_indices):
-                active_contexts.pop(i)
-                runs.pop(i)
+        for i in reversed(failed_indices):
+            active_contexts.pop(i)
+            runs.pop(i)
 
-            if not active_contexts:
-                logger.warning("All defenses failed; stopping evaluation.")
-                registry.close_queue(worker_id)
-                return
+        if not active_contexts:
+            logger.warning("All defenses failed; stopping evaluation.")
+            registry.close_queue(worker_id, registered_ids)
+            return
 
         # Mark evaluation runs as done and aggregate pair scores.
         for ctx, run_id in zip(active_contexts, runs):
@@ -2,7 +2,6 @@
 
 from __future__ import annotations
 
-import concurrent.futures
 import re as _re
 import shutil
 import tempfile
@@ -10,6 +9,7 @@ from pathlib import Path
 import docker
 import git
 from celery.utils.log import get_task_logger
+from .builder import build_image
 from .validation import validate_dockerfile_safety, validate_build_context
 
 logger = get_task_logger(__name__)
@@ -88,16 +88,21 @@ def build_from_github_repo(
 
         # Extract security settings from config
         source_config = config.get('defense', {}).get('build', {})
-        no_cache = source_config.get('no_cache', True)
+        no_cache = source_config.get('no_cache', False)
+        cache_from = source_config.get('cache_from') or None
         build_timeout = source_config.get('max_build_time_seconds', 300)
         network_disabled = source_config.get('network_disabled', True)
         network_mode = 'none' if network_disabled else 'default'
 
-        def _run_build():
-            return client.images.build(
+        try:
+            build_image(
+                client,
+                build_timeout,
+                logger,
                 path=str(build_context),
                 tag=image_name,
                 nocache=no_cache,
+                cache_from=cache_from,
                 rm=True,
                 forcerm=True,
                 pull=False,
@@ -105,21 +110,6 @@ def build_from_github_repo(
                 use_config_proxy=False
             )
 
-        try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_run_build)
-                try:
-                    image, build_logs = future.result(timeout=build_timeout)
-                except concurrent.futures.TimeoutError:
-                    future.cancel()
-                    raise ValueError(
-                        f"Docker build timed out after {build_timeout} seconds"
-                    )
-
-            for log_entry in build_logs:
-                if 'stream' in log_entry:
-                    logger.info(log_entry['stream'].strip())
-
             logger.info(f"Successfully built image: {image_name}")
             return image_name
 
@@ -2,14 +2,19 @@
 
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import random
+from collections import deque
 from pathlib import Path
+from typing import Iterator
 
 import docker
+import orjson
 import requests
 from celery.utils.log import get_task_logger
+from requests.adapters import HTTPAdapter
 
 from worker.config import EvaluationConfig, ValidationConfig
 from worker.db import (
@@ -18,11 +23,62 @@ from worker.db import (
     insert_heurval_file_result,
     upsert_heurval_result,
 )
-from worker.cache_handler import get_sample_path
-from worker.defense.evaluate import ContainerRestartError, evaluate_sample_against_container
+from worker.cache_handler import get_sample_path, read_sample
+from worker.defense.evaluate import (
+    ContainerRestartError,
+    evaluate_sample_against_container,
+)
 
 logger = get_task_logger(__name__)
 
+MAX_CONTEXT_SIZE_MB = 2048  # 2 GB
+MAX_FILE_COUNT = 50000
+
+
+def _load_probe_data() -> bytes:
+    """Return the minimal PE header sent by _validate_post_endpoint."""
+    probe_path = Path(__file__).parent.parent / "tests" / "minimal.exe"
+    try:
+        with open(probe_path, "rb") as f:
+            return f.read(4096)
+    except OSError:
+        pass
+
+    # Fallback: Realistic benign PE stub
+    probe_data = (
+        b"MZ\x90\x00\x03\x00\x00\x00\x04\x00\x00\x00\xff\xff\x00\x00"
+        b"\xb8\x00\x00\x00\x00\x00\x00\x00\x40\x00\x00\x00\x00\x00\x00\x00"
+        b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+        b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\x00\x00\x00"
+        b"\x0e\x1f\xba\x0e\x00\xb4\x09\xcd\x21\xb8\x01\x4c\xcd\x21\x54\x68"
+        b"\x69\x73\x20\x70\x72\x6f\x67\x72\x61\x6d\x20\x63\x61\x6e\x6e\x6f"
+        b"\x74\x20\x62\x65\x20\x72\x75\x6e\x20\x69\x6e\x20\x44\x4f\x53\x20"
+        b"\x6d\x6f\x64\x65\x2e\x0d\x0d\x0a\x24\x00\x00\x00\x00\x00\x00\x00"
+        b"PE\x00\x00\x4c\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+        b"\xe0\x00\x02\x01\x0b\x01\x02\x1e\x00\x02\x00\x00\x00\x00\x00\x00"
+        b"\x00\x00\x00\x00\x00\x10\x00\x00\x00\x20\x00\x00\x00\x00\x00\x00"
+        b"\x00\x00\x40\x00\x00\x10\x00\x00\x00\x02\x00\x00\x04\x00\x00\x00"
+        b"\x00\x00\x00\x00\x04\x00\x00\x00\x00\x00\x00\x00\x00\x30\x00\x00"
+        b"\x00\x02\x00\x00\x00\x00\x00\x00\x03\x00\x00\x00\x00\x00\x10\x00"
+        b"\x00\x10\x00\x00\x00\x00\x10\x00\x00\x10\x00\x00\x00\x00\x00\x00"
+        b"\x10\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
+    )
+    return probe_data + b"\x00" * (4096 - len(probe_data))
+
+
+# Loaded once at import rather than on every validation
+_PROBE_DATA = _load_probe_data()
+
+# Keep-alive pool shared by the functional validation probes
+_SESSION = requests.Session()
+_SESSION.mount("http://", HTTPAdapter(pool_connections=16, pool_maxsize=64, max_retries=0))
+_SESSION.headers["Content-Type"] = "application/octet-stream"
+
+
+def get_http_session() -> requests.Session:
+    """Keep-alive session for requests to defense containers during validation."""
+    return _SESSION
+
 
 def validate_dockerfile_safety(dockerfile_path: Path, config: dict) -> None:
     """
@@ -43,18 +99,27 @@ def validate_dockerfile_safety(dockerfile_path: Path, config: dict) -> None:
     max_size_kb = source_config.get('max_dockerfile_size_kb', 100)
     max_size_bytes = max_size_kb * 1024
 
-    # Check file size
-    size_bytes = dockerfile_path.stat().st_size
+    # Single bounded read: enforces the size limit and surfaces decoding
+    # errors without a separate stat() and full read_text() pass
+    try:
+        with dockerfile_path.open('rb') as f:
+            data = f.read(max_size_bytes + 1)
+            size_bytes = (
+                os.fstat(f.fileno()).st_size
+                if len(data) > max_size_bytes else len(data)
+            )
+    except OSError as e:
+        raise ValueError(f"Failed to read Dockerfile: {e}") from e
+
     if size_bytes > max_size_bytes:
         raise ValueError(
             f"Dockerfile too large: {size_bytes} bytes "
             f"(max: {max_size_bytes})"
         )
 
-    # Read Dockerfile content for validation
     try:
-        dockerfile_path.read_text(encoding='utf-8')
-    except Exception as e:
+        data.decode('utf-8')
+    except UnicodeDecodeError as e:
         raise ValueError(f"Failed to read Dockerfile: {e}") from e
 
     # Future: Add more security checks here
@@ -65,6 +130,37 @@ def validate_dockerfile_safety(dockerfile_path: Path, config: dict) -> None:
     logger.info(f"Dockerfile passed safety checks ({size_bytes} bytes)")
 
 
+def _iter_context(root: Path) -> Iterator[tuple[os.DirEntry, int]]:
+    """
+    Yield (entry, size) for every non-directory entry under root.
+
+    Walks iteratively with os.scandir so sizes come straight from the
+    DirEntry (lstat, symlinks are not followed) without building a Path
+    per file.
+
+    Raises:
+        ValueError: If a directory in the context cannot be read
+    """
+    pending = deque([os.fspath(root)])
+    while pending:
+        path = pending.popleft()
+        try:
+            it = os.scandir(path)
+        except OSError as e:
+            raise ValueError(f"Cannot read build context directory {path}: {e}") from e
+        with it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(entry.path)
+                        continue
+                    size = entry.stat(follow_symlinks=False).st_size
+                except OSError as e:
+                    logger.warning(f"Could not stat {entry.path}: {e}")
+                    size = 0
+                yield entry, size
+
+
 def validate_build_context(build_context: Path, config: dict) -> None:
     """
     Validate build context for security issues.
@@ -81,36 +177,28 @@ def validate_build_context(build_context: Path, config: dict) -> None:
     Raises:
         ValueError: If build context fails security checks
     """
-    # Count files and calculate total size
+    # Limits are checked while walking so oversized contexts are rejected
+    # as soon as a threshold is crossed rather than after a full walk.
+    max_bytes = MAX_CONTEXT_SIZE_MB << 20
+    max_files = MAX_FILE_COUNT
     file_count = 0
     total_size = 0
 
-    for root, dirs, files in os.walk(build_context):
-        file_count += len(files)
-        for file in files:
-            file_path = Path(root) / file
-            try:
-                total_size += file_path.stat().st_size
-            except Exception as e:
-                logger.warning(f"Could not stat {file_path}: {e}")
-
-    # Check limits (use reasonable defaults)
-    MAX_CONTEXT_SIZE_MB = 2048  # 2 GB
-    MAX_FILE_COUNT = 50000
+    for _entry, size in _iter_context(build_context):
+        file_count += 1
+        if file_count > max_files:
+            raise ValueError(
+                f"Build context has too many files: at least {file_count} "
+                f"(max: {max_files})"
+            )
+        total_size += size
+        if total_size > max_bytes:
+            raise ValueError(
+                f"Build context too large: at least {total_size / (1024 * 1024):.2f} MB "
+                f"(max: {MAX_CONTEXT_SIZE_MB} MB)"
+            )
 
     total_size_mb = total_size / (1024 * 1024)
-    if total_size_mb > MAX_CONTEXT_SIZE_MB:
-        raise ValueError(
-            f"Build context too large: {total_size_mb:.2f} MB "
-            f"(max: {MAX_CONTEXT_SIZE_MB} MB)"
-        )
-
-    if file_count > MAX_FILE_COUNT:
-        raise ValueError(
-            f"Build context has too many files: {file_count} "
-            f"(max: {MAX_FILE_COUNT})"
-        )
-
     logger.info(
         f"Build context passed validation "
         f"({file_count} files, {total_size_mb:.2f} MB)"
@@ -152,10 +240,8 @@ def validate_functional(
 
 def _validate_image_size(image_name: str, config: dict) -> None:
     """Check uncompressed image size against limits."""
-    client = docker.from_env()
-
     try:
-        image = client.images.get(image_name)
+        image = docker.from_env().images.get(image_name)
         size_bytes = image.attrs.get('Size', 0)
         size_mb = size_bytes / (1024 * 1024)
 
@@ -183,45 +269,15 @@ def _validate_post_endpoint(container_url: str, config: dict) -> None:
 
     Sends minimal PE header and validates response format.
     """
-    # Prepare probe data (minimal PE header)
-    probe_path = Path(__file__).parent.parent / "tests" / "minimal.exe"
-    if probe_path.exists():
-        with open(probe_path, "rb") as f:
-            probe_data = f.read(4096)
-    else:
-        # Fallback: Realistic benign PE stub
-        probe_data = (
-            b"MZ\x90\x00\x03\x00\x00\x00\x04\x00\x00\x00\xff\xff\x00\x00"
-            b"\xb8\x00\x00\x00\x00\x00\x00\x00\x40\x00\x00\x00\x00\x00\x00\x00"
-            b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
-            b"\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\x00\x00\x00"
-            b"\x0e\x1f\xba\x0e\x00\xb4\x09\xcd\x21\xb8\x01\x4c\xcd\x21\x54\x68"
-            b"\x69\x73\x20\x70\x72\x6f\x67\x72\x61\x6d\x20\x63\x61\x6e\x6e\x6f"
-            b"\x74\x20\x62\x65\x20\x72\x75\x6e\x20\x69\x6e\x20\x44\x4f\x53\x20"
-            b"\x6d\x6f\x64\x65\x2e\x0d\x0d\x0a\x24\x00\x00\x00\x00\x00\x00\x00"
-            b"PE\x00\x00\x4c\x01\x01\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
-            b"\xe0\x00\x02\x01\x0b\x01\x02\x1e\x00\x02\x00\x00\x00\x00\x00\x00"
-            b"\x00\x00\x00\x00\x00\x10\x00\x00\x00\x20\x00\x00\x00\x00\x00\x00"
-            b"\x00\x00\x40\x00\x00\x10\x00\x00\x00\x02\x00\x00\x04\x00\x00\x00"
-            b"\x00\x00\x00\x00\x04\x00\x00\x00\x00\x00\x00\x00\x00\x30\x00\x00"
-            b"\x00\x02\x00\x00\x00\x00\x00\x00\x03\x00\x00\x00\x00\x00\x10\x00"
-            b"\x00\x10\x00\x00\x00\x00\x10\x00\x00\x10\x00\x00\x00\x00\x00\x00"
-            b"\x10\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00"
-        )
-        probe_data += b"\x00" * (4096 - len(probe_data))
-
     # Get timeout from config
     eval_config = config.get('defense', {}).get('evaluation', {})
     timeout = eval_config.get('requests_timeout_seconds', 5)
 
     # Send POST request direct to container (via gateway NAT)
     try:
-        response = requests.post(
+        response = _SESSION.post(
             container_url,
-            data=probe_data,
-            headers={
-                "Content-Type": "application/octet-stream"
-            },
+            data=_PROBE_DATA,
             timeout=timeout
         )
     except requests.exceptions.RequestException as e:
@@ -245,7 +301,7 @@ def _validate_post_endpoint(container_url: str, config: dict) -> None:
 
     # Check response format and prediction value
     try:
-        result_json = response.json()
+        result_json = orjson.loads(response.content)
         prediction = result_json.get("result")
         if prediction not in [0, 1]:
             raise ValueError(
@@ -320,7 +376,7 @@ async def validate_heuristic(
 
     for sample in samples:
         sample_path = await get_sample_path(sample["object_key"])
-        sample_content = Path(sample_path).read_bytes()
+        sample_content = await asyncio.to_thread(read_sample, sample_path)
 
         outcome = await evaluate_sample_against_container(
             container_url=container_url,
@@ -8,15 +8,21 @@ import shutil
 import tempfile
 import zipfile
 from pathlib import Path
+from typing import IO
 import docker
 from ..minio_client import get_minio_client, get_bucket_name
 from celery.utils.log import get_task_logger
+from .builder import build_image
 from .validation import validate_dockerfile_safety, validate_build_context
 
 logger = get_task_logger(__name__)
 
 MAX_FILE_COUNT = 10000  # Maximum number of files in archive
 MAX_COMPRESSION_RATIO = 100  # Reject ZIPs with ratio above this (zip bomb heuristic)
+EXTRACT_WORKERS = 4  # Threads used to decompress archive members
+EXTRACT_BUFFER_SIZE = 1 << 20  # 1 MiB copy buffer per member
+DOWNLOAD_CHUNK_SIZE = 1 << 20  # 1 MiB reads from the MinIO response
+ZIP_SPOOL_MAX_BYTES = 256 << 20  # Archives larger than this spill to disk
 
 
 def build_from_zip_archive(
@@ -40,7 +46,7 @@ def build_from_zip_archive(
     Raises:
         ValueError: If download, extraction, validation, or building fails
     """
-    temp_zip = None
+    zip_buffer = None
     temp_extract_dir = None
 
     try:
@@ -51,34 +57,45 @@ def build_from_zip_archive(
             client = minio_client
         bucket_name = get_bucket_name()
 
-        # Download ZIP to temporary file
-        temp_zip = tempfile.NamedTemporaryFile(
-            suffix='.zip',
-            prefix=f'defense_{submission_id}_',
-            delete=False
-        )
-        temp_zip.close()
+        source_config = config.get('defense', {}).get('build', {})
+        max_zip_size_mb = source_config.get('max_zip_size_mb', 512)
+        max_zip_size_bytes = max_zip_size_mb * 1024 * 1024
 
         logger.info(
             f"Downloading {object_key} from MinIO bucket {bucket_name}")
 
+        # Stream the archive straight into a spooled buffer (memory first,
+        # disk past ZIP_SPOOL_MAX_BYTES) instead of writing a temp file and
+        # reading it back, enforcing the size limit as bytes arrive.
+        zip_buffer = tempfile.SpooledTemporaryFile(
+            max_size=ZIP_SPOOL_MAX_BYTES,
+            suffix='.zip',
+            prefix=f'defense_{submission_id}_'
+        )
         try:
-            client.fget_object(bucket_name, object_key, temp_zip.name)
-            logger.info(f"Downloaded {object_key} to {temp_zip.name}")
+            response = client.get_object(bucket_name, object_key)
         except Exception as e:
             raise ValueError(f"Failed to download from MinIO: {e}") from e
 
-        # Verify file size
-        zip_size_bytes = os.path.getsize(temp_zip.name)
-        source_config = config.get('defense', {}).get('build', {})
-        max_zip_size_mb = source_config.get('max_zip_size_mb', 512)
-        max_zip_size_bytes = max_zip_size_mb * 1024 * 1024
+        zip_size_bytes = 0
+        try:
+            while chunk := response.read(DOWNLOAD_CHUNK_SIZE):
+                zip_size_bytes += len(chunk)
+                if zip_size_bytes > max_zip_size_bytes:
+                    raise ValueError(
+                        f"ZIP file too large: exceeds {max_zip_size_bytes} bytes"
+                    )
+                zip_buffer.write(chunk)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Failed to download from MinIO: {e}") from e
+        finally:
+            response.close()
+            response.release_conn()
 
-        if zip_size_bytes > max_zip_size_bytes:
-            raise ValueError(
-                f"ZIP file too large: {zip_size_bytes} bytes "
-                f"(max: {max_zip_size_bytes})"
-            )
+        zip_buffer.seek(0)
+        logger.info(f"Downloaded {object_key} ({zip_size_bytes} bytes)")
 
         max_uncompressed_mb = source_config.get('max_uncompressed_zip_size_mb', 2048)
 
@@ -88,7 +105,7 @@ def build_from_zip_archive(
         logger.info(f"Extracting ZIP to {temp_extract_dir}")
 
         # Extract with security checks
-        _extract_zip_safely(temp_zip.name, temp_extract_dir, max_uncompressed_mb)
+        _extract_zip_safely(zip_buffer, temp_extract_dir, max_uncompressed_mb)
         logger.info("Successfully extracted ZIP archive")
 
         # Validate build context and Dockerfile
@@ -118,16 +135,21 @@ def build_from_zip_archive(
         docker_client = docker.from_env()
 
         # Extract security settings from config
-        no_cache = source_config.get('no_cache', True)
+        no_cache = source_config.get('no_cache', False)
+        cache_from = source_config.get('cache_from') or None
         build_timeout = source_config.get('max_build_time_seconds', 300)
         network_disabled = source_config.get('network_disabled', True)
         network_mode = 'none' if network_disabled else 'default'
 
-        def _run_build():
-            return docker_client.images.build(
+        try:
+            build_image(
+                docker_client,
+                build_timeout,
+                logger,
                 path=str(build_context),
                 tag=image_name,
                 nocache=no_cache,
+                cache_from=cache_from,
                 rm=True,
                 forcerm=True,
                 pull=False,
@@ -135,21 +157,6 @@ def build_from_zip_archive(
                 use_config_proxy=False
             )
 
-        try:
-            with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
-                future = executor.submit(_run_build)
-                try:
-                    image, build_logs = future.result(timeout=build_timeout)
-                except concurrent.futures.TimeoutError:
-                    future.cancel()
-                    raise ValueError(
-                        f"Docker build timed out after {build_timeout} seconds"
-                    )
-
-            for log_entry in build_logs:
-                if 'stream' in log_entry:
-                    logger.info(log_entry['stream'].strip())
-
             logger.info(f"Successfully built image: {image_name}")
             return image_name
 
@@ -161,13 +168,9 @@ def build_from_zip_archive(
             raise ValueError(f"Docker API error during build: {e}") from e
 
     finally:
-        # Cleanup: remove temporary files and directories
-        if temp_zip and os.path.exists(temp_zip.name):
-            try:
-                os.unlink(temp_zip.name)
-                logger.info(f"Cleaned up temporary ZIP: {temp_zip.name}")
-            except Exception as e:
-                logger.warning(f"Failed to cleanup {temp_zip.name}: {e}")
+        # Cleanup: release the archive buffer and extraction directory
+        if zip_buffer is not None:
+            zip_buffer.close()
 
         if temp_extract_dir and Path(temp_extract_dir).exists():
             try:
@@ -179,7 +182,7 @@ def build_from_zip_archive(
 
 
 def _extract_zip_safely(
-    zip_path: str,
+    zip_file: str | IO[bytes],
     extract_to: str,
     max_uncompressed_mb: int = 2048,
 ) -> None:
@@ -192,7 +195,7 @@ def _extract_zip_safely(
     - Excessive file counts
 
     Args:
-        zip_path: Path to ZIP file
+        zip_file: Path to ZIP file or a seekable binary file object
         extract_to: Directory to extract to
         max_uncompressed_mb: Maximum allowed uncompressed size in MB
 
@@ -202,32 +205,42 @@ def _extract_zip_safely(
     max_total_size = max_uncompressed_mb * 1024 * 1024
 
     try:
-        with zipfile.ZipFile(zip_path, 'r') as zf:
-            # Check for path traversal
-            for member in zf.namelist():
-                normalized = os.path.normpath(member)
-                if normalized.startswith('..') or os.path.isabs(normalized):
-                    raise ValueError(
-                        f"Malicious path in ZIP: {member} "
-                        "(path traversal detected)"
-                    )
-
-            # Check file count
-            if len(zf.namelist()) > MAX_FILE_COUNT:
+        with zipfile.ZipFile(zip_file, 'r') as zf:
+            # Single pass over the central directory: path traversal,
+            # duplicate targets, file count and size totals, failing on the
+            # first limit breached.
+            infos = zf.infolist()
+            if len(infos) > MAX_FILE_COUNT:
                 raise ValueError(
-                    f"ZIP contains too many files: {len(zf.namelist())} "
+                    f"ZIP contains too many files: {len(infos)} "
                     f"(max: {MAX_FILE_COUNT})"
                 )
 
-            # Check total uncompressed size and compression ratio (zip bomb protection)
-            total_uncompressed = sum(info.file_size for info in zf.infolist())
-            total_compressed = sum(info.compress_size for info in zf.infolist())
-
-            if total_uncompressed > max_total_size:
-                raise ValueError(
-                    f"ZIP uncompressed size too large: {total_uncompressed} bytes "
-                    f"(max: {max_total_size})"
-                )
+            total_uncompressed = 0
+            total_compressed = 0
+            targets: set[tuple[str, ...]] = set()
+            for info in infos:
+                member = info.filename
+                if _is_unsafe_member(member):
+                    raise ValueError(
+                        f"Malicious path in ZIP: {member} "
+                        "(path traversal detected)"
+                    )
+                # Members are written concurrently, so two entries resolving
+                # to the same file would race; zip allows repeated names.
+                target = _member_target(member)
+                if target in targets:
+                    raise ValueError(f"Duplicate path in ZIP: {member}")
+                targets.add(target)
+
+                total_uncompressed += info.file_size
+                total_compressed += info.compress_size
+                # Zip bomb protection
+                if total_uncompressed > max_total_size:
+                    raise ValueError(
+                        f"ZIP uncompressed size too large: {total_uncompressed}+ bytes "
+                        f"(max: {max_total_size})"
+                    )
 
             if total_compressed > 0:
                 ratio = total_uncompressed / total_compressed
@@ -236,10 +249,46 @@ def _extract_zip_safely(
                         f"Suspicious compression ratio ({ratio:.0f}x), possible ZIP bomb"
                     )
 
-            # Extract all files
-            zf.extractall(extract_to)
+            # Extract the already-validated entries. Members are decompressed
+            # in parallel (zlib releases the GIL) and streamed to disk through
+            # a fixed-size buffer instead of being read whole.
+            with concurrent.futures.ThreadPoolExecutor(
+                max_workers=EXTRACT_WORKERS
+            ) as executor:
+                list(executor.map(
+                    lambda info: _extract_member(zf, info, extract_to), infos
+                ))
 
     except zipfile.BadZipFile as e:
         raise ValueError(f"Invalid ZIP file: {e}") from e
     except Exception as e:
         raise ValueError(f"Failed to extract ZIP: {e}") from e
+
+
+def _is_unsafe_member(member: str) -> bool:
+    """
+    Return True if an archive member name could escape the extraction root.
+
+    Rejects absolute paths, Windows drive prefixes and any '..' segment using
+    plain string checks rather than normalizing every entry.
+    """
+    if member.startswith(('/', '\\')) or ':' in member[:3]:
+        return True
+    return '..' in member.replace('\\', '/').split('/')
+
+
+def _member_target(member: str) -> tuple[str, ...]:
+    """Path segments a member is written to, ignoring empty and '.' segments."""
+    return tuple(part for part in member.split('/') if part not in ('', '.'))
+
+
+def _extract_member(zf: zipfile.ZipFile, info: zipfile.ZipInfo, extract_to: str) -> None:
+    """Write a single validated archive member below extract_to."""
+    target = os.path.join(extract_to, *_member_target(info.filename))
+    if info.is_dir():
+        os.makedirs(target, exist_ok=True)
+        return
+
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with zf.open(info) as src, open(target, 'wb') as dst:
+        shutil.copyfileobj(src, dst, length=EXTRACT_BUFFER_SIZE)
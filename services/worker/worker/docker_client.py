@@ -0,0 +1,18 @@
+"""Shared Docker client factory for the worker."""
+
+from __future__ import annotations
+
+from functools import lru_cache
+
+import docker
+
+
+@lru_cache(maxsize=1)
+def get_docker_client() -> docker.DockerClient:
+    """Singleton Docker client, reusing one API connection pool per process.
+
+    docker-py clients are not safe to share between threads, so this is only
+    for sequential callers. Code that runs concurrently, such as per-defense
+    setup and image builds, creates its own client with docker.from_env().
+    """
+    return docker.from_env()
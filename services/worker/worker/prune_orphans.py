@@ -2,6 +2,7 @@ import docker
 import docker.errors
 from celery.utils.log import get_task_logger
 from worker.db import get_engine
+from worker.docker_client import get_docker_client
 from worker.redis_client import get_redis_client
 
 logger = get_task_logger(__name__)
@@ -21,7 +22,7 @@ def prune_orphans():
 
     try:
         from sqlalchemy import text
-        client = docker.from_env()
+        client = get_docker_client()
         engine = get_engine()
         
         # Prune orphaned evaluation containers
@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import os
 import time
+from functools import cached_property, lru_cache
 from typing import Optional
 import redis
 from celery.utils.log import get_task_logger
@@ -11,10 +12,43 @@ from celery.utils.log import get_task_logger
 logger = get_task_logger(__name__)
 
 
+REDIS_MAX_CONNECTIONS = 128  # per-process pool size shared by all callers
+REDIS_CONNECT_TIMEOUT = 5  # seconds; no read timeout so BLPOP can block freely
+REDIS_HEALTH_CHECK_INTERVAL = 30  # seconds idle before a pooled connection is PINGed
+WORKER_METADATA_TTL = 6 * 3600  # seconds without a heartbeat before worker keys expire
+
+# Stamp the heartbeat with the Redis server clock and push the TTL of the
+# metadata (KEYS[1]) and attack queue (KEYS[2]) forward in one round trip.
+# ARGV[1] is the TTL in seconds.
+_HEARTBEAT_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local now = redis.call('TIME')
+redis.call('HSET', KEYS[1], 'heartbeat', now[1] .. '.' .. string.format('%06d', now[2]))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[2], ARGV[1])
+return now[1]
+"""
+
+
+@lru_cache(maxsize=1)
 def get_redis_client() -> redis.Redis:
-    """Get Redis client instance."""
+    """
+    Get the process-wide Redis client (one shared connection pool).
+
+    redis-py picks the hiredis reply parser automatically when it is
+    installed.
+    """
     redis_url = os.getenv("REDIS_URL", "redis://redis:6379/0")
-    return redis.from_url(redis_url, decode_responses=True)
+    return redis.from_url(
+        redis_url,
+        decode_responses=True,
+        max_connections=REDIS_MAX_CONNECTIONS,
+        socket_keepalive=True,
+        socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+        health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+    )
 
 
 class WorkerRegistry:
@@ -30,6 +64,11 @@ class WorkerRegistry:
     def __init__(self):
         self.client = get_redis_client()
 
+    @cached_property
+    def _heartbeat_script(self):
+        """Heartbeat Lua script bound to this registry's client."""
+        return self.client.register_script(_HEARTBEAT_SCRIPT)
+
     def register(self, worker_id: str, defense_submission_ids: list[str], job_id: str) -> None:
         """
         Register worker with OPEN queue state.
@@ -41,17 +80,70 @@ class WorkerRegistry:
         """
         logger.info(f"Registering worker {worker_id} with Redis for {len(defense_submission_ids)} defenses")
 
-        self.client.hset(f"worker:{worker_id}:metadata", mapping={
-            "defense_submission_ids": ",".join(map(str, defense_submission_ids)),
-            "job_id": str(job_id),
-            "started_at": str(time.time()),
-            "queue_state": "OPEN",
-            "heartbeat": str(time.time())
-        })
-        self.client.sadd("workers:active", worker_id)
+        now = str(time.time())
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.hset(f"worker:{worker_id}:metadata", mapping={
+                "defense_submission_ids": ",".join(map(str, defense_submission_ids)),
+                "job_id": str(job_id),
+                "started_at": now,
+                "queue_state": "OPEN",
+                "heartbeat": now
+            })
+            pipe.expire(f"worker:{worker_id}:metadata", WORKER_METADATA_TTL)
+            pipe.sadd("workers:active", worker_id)
+            for defense_id in defense_submission_ids:
+                pipe.sadd(f"workers:open:{defense_id}", worker_id)
+            pipe.execute()
 
         logger.info(f"Worker {worker_id} registered with OPEN queue state")
 
+    @staticmethod
+    def _merge_defense_ids(metadata: dict, defense_ids: Optional[list[str]]) -> list[str]:
+        """Explicit defense IDs plus those recorded in the worker's metadata."""
+        recorded = metadata.get("defense_submission_ids")
+        merged = dict.fromkeys(map(str, defense_ids or ()))
+        merged.update(dict.fromkeys(recorded.split(",") if recorded else ()))
+        return list(merged)
+
+    def _live_workers(self, open_workers: dict[str, list[str]]) -> dict[str, list[str]]:
+        """
+        Drop workers whose metadata has expired from the open index.
+
+        A worker that died without unregistering stops heartbeating, so its
+        metadata expires; its index entries are removed here on first sight.
+
+        Args:
+            open_workers: Indexed worker IDs for each defense submission UUID
+
+        Returns:
+            The same mapping restricted to workers whose metadata still exists
+        """
+        worker_ids = list(dict.fromkeys(
+            w for workers in open_workers.values() for w in workers))
+        if not worker_ids:
+            return open_workers
+
+        with self.client.pipeline(transaction=False) as pipe:
+            for worker_id in worker_ids:
+                pipe.exists(f"worker:{worker_id}:metadata")
+            alive = {w for w, exists in zip(worker_ids, pipe.execute()) if exists}
+
+        if len(alive) == len(worker_ids):
+            return open_workers
+
+        with self.client.pipeline(transaction=False) as pipe:
+            for defense_id, workers in open_workers.items():
+                stale = [w for w in workers if w not in alive]
+                if stale:
+                    pipe.srem(f"workers:open:{defense_id}", *stale)
+            pipe.execute()
+        logger.info(
+            f"Dropped {len(worker_ids) - len(alive)} expired workers from the open index")
+        return {
+            defense_id: [w for w in workers if w in alive]
+            for defense_id, workers in open_workers.items()
+        }
+
     def add_attack_to_queue(self, worker_id: str, attack_id: str) -> None:
         """
         Add attack to worker's INTERNAL_QUEUE.
@@ -60,22 +152,36 @@ class WorkerRegistry:
             worker_id: Worker identifier
             attack_id: Attack submission UUID to add to queue
         """
-        self.client.rpush(f"worker:{worker_id}:attacks", str(attack_id))
+        self.add_attack_to_queues([worker_id], attack_id)
+
+    def add_attack_to_queues(self, worker_ids: list[str], attack_id: str) -> None:
+        """
+        Add an attack to several workers' INTERNAL_QUEUEs in one round trip.
+
+        Args:
+            worker_ids: Worker identifiers
+            attack_id: Attack submission UUID to add to each queue
+        """
+        with self.client.pipeline(transaction=False) as pipe:
+            for worker_id in worker_ids:
+                pipe.rpush(f"worker:{worker_id}:attacks", str(attack_id))
+                pipe.expire(f"worker:{worker_id}:attacks", WORKER_METADATA_TTL)
+            pipe.execute()
         logger.debug(
-            f"Added attack {attack_id} to worker {worker_id} INTERNAL_QUEUE")
+            f"Added attack {attack_id} to {len(worker_ids)} worker INTERNAL_QUEUEs")
 
-    def pop_next_attack(self, worker_id: str) -> Optional[str]:
+    def pop_next_attack(self, worker_id: str, timeout: int = 1) -> Optional[str]:
         """
         Pop next attack from INTERNAL_QUEUE (blocking with timeout).
 
         Args:
             worker_id: Worker identifier
+            timeout: Seconds the server-side BLPOP waits before giving up
 
         Returns:
             Attack ID if available, None if queue empty after timeout
         """
-        # Use blocking pop with 1 second timeout
-        result = self.client.blpop(f"worker:{worker_id}:attacks", timeout=1)
+        result = self.client.blpop(f"worker:{worker_id}:attacks", timeout=timeout)
 
         if result:
             # result is tuple (key, value)
@@ -85,44 +191,72 @@ class WorkerRegistry:
 
         return None
 
-    def close_queue(self, worker_id: str) -> None:
+    def close_queue(self, worker_id: str, defense_ids: Optional[list[str]] = None) -> None:
         """
         Mark worker's queue as CLOSED.
 
         Args:
             worker_id: Worker identifier
+            defense_ids: Defense submission UUIDs the worker registered for;
+                merged with those recorded in its metadata so the open index
+                is cleaned up even after the metadata has expired
         """
-        self.client.hset(
-            f"worker:{worker_id}:metadata", "queue_state", "CLOSED")
+        key = f"worker:{worker_id}:metadata"
+        metadata = self.client.hgetall(key)
+        defense_ids = self._merge_defense_ids(metadata, defense_ids)
+        with self.client.pipeline(transaction=False) as pipe:
+            # Expired metadata is not recreated as a bare, TTL-less hash
+            if metadata:
+                pipe.hset(key, "queue_state", "CLOSED")
+            for defense_id in defense_ids:
+                pipe.srem(f"workers:open:{defense_id}", worker_id)
+            pipe.execute()
         logger.info(f"Worker {worker_id} queue marked CLOSED")
 
     def heartbeat(self, worker_id: str) -> None:
         """
         Update worker heartbeat timestamp.
 
-        Enables monitoring for stale workers.
+        Enables monitoring for stale workers. The timestamp comes from the
+        Redis server clock, and the metadata and attack queue TTLs are
+        refreshed so keys of workers that died without unregistering expire
+        on their own; their open-index entries are dropped on the next lookup.
+        Metadata that has already expired is not recreated.
 
         Args:
             worker_id: Worker identifier
         """
-        self.client.hset(f"worker:{worker_id}:metadata",
-                         "heartbeat", str(time.time()))
+        self._heartbeat_script(
+            keys=[f"worker:{worker_id}:metadata", f"worker:{worker_id}:attacks"],
+            args=[WORKER_METADATA_TTL])
 
-    def unregister(self, worker_id: str) -> None:
+    def unregister(self, worker_id: str, defense_ids: Optional[list[str]] = None) -> None:
         """
         Cleanup worker registration on exit.
 
         Args:
             worker_id: Worker identifier
+            defense_ids: Defense submission UUIDs the worker registered for;
+                merged with those recorded in its metadata so the open index
+                is cleaned up even after the metadata has expired
         """
         logger.info(f"Unregistering worker {worker_id}")
 
-        # Delete worker metadata and queue
-        self.client.delete(f"worker:{worker_id}:metadata")
-        self.client.delete(f"worker:{worker_id}:attacks")
+        defense_ids = self._merge_defense_ids(
+            self.client.hgetall(f"worker:{worker_id}:metadata"), defense_ids)
+
+        with self.client.pipeline(transaction=False) as pipe:
+            # Drop the worker from the per-defense open index
+            for defense_id in defense_ids:
+                pipe.srem(f"workers:open:{defense_id}", worker_id)
 
-        # Remove from active workers set
-        self.client.srem("workers:active", worker_id)
+            # Delete worker metadata and queue
+            pipe.delete(f"worker:{worker_id}:metadata",
+                        f"worker:{worker_id}:attacks")
+
+            # Remove from active workers set
+            pipe.srem("workers:active", worker_id)
+            pipe.execute()
 
         logger.info(f"Worker {worker_id} cleaned up from Redis")
 
@@ -131,6 +265,8 @@ class WorkerRegistry:
         Find workers for this defense with OPEN queue state.
 
         Used by attack job to distribute new attacks to running workers.
+        Reads the workers:open:{defense_id} index maintained by register(),
+        close_queue() and unregister(), skipping workers whose metadata expired.
 
         Args:
             defense_id: Defense submission UUID
@@ -138,26 +274,15 @@ class WorkerRegistry:
         Returns:
             List of worker IDs with OPEN queues for this defense
         """
-        all_workers = self.client.smembers("workers:active")
-        open_workers = []
-
-        for worker_id in all_workers:
-            metadata = self.client.hgetall(f"worker:{worker_id}:metadata")
-            
-            defense_ids_str = metadata.get("defense_submission_ids", "")
-            defense_ids = defense_ids_str.split(",") if defense_ids_str else []
-
-            if (str(defense_id) in defense_ids and
-                    metadata.get("queue_state") == "OPEN"):
-                open_workers.append(worker_id)
-
-        return open_workers
+        workers = list(self.client.smembers(f"workers:open:{defense_id}"))
+        return self._live_workers({defense_id: workers})[defense_id]
 
     def mark_evaluation_queued(self, defense_id: str, attack_id: str, job_id: str) -> bool:
         """
         Atomically mark evaluation as queued (prevent duplicates).
 
-        Uses SETNX (SET if Not eXists) for atomic operation.
+        Single-defense form of mark_evaluations_queued(); the claim is a
+        SET NX EX so it and its 24h expiry are a single atomic command.
 
         Args:
             defense_id: Defense submission UUID
@@ -167,20 +292,42 @@ class WorkerRegistry:
         Returns:
             True if successfully marked (first to claim), False if already exists
         """
-        key = f"evaluations:queued:{defense_id}:{attack_id}"
-        result = self.client.setnx(key, str(job_id))
+        return defense_id in self.mark_evaluations_queued({defense_id: job_id}, attack_id)
 
-        if result:
-            # Set expiration to 24 hours (cleanup old entries)
-            self.client.expire(key, 86400)
+    def mark_evaluations_queued(self, job_ids: dict[str, str], attack_id: str) -> dict[str, list[str]]:
+        """
+        Claim several defense/attack pairs and find their open workers.
+
+        Pipelines the SET NX EX claim of mark_evaluation_queued() with the
+        open-worker lookup of get_open_workers_for_defense() for every defense,
+        so the whole fan-out costs one round trip.
 
-        return bool(result)
+        Args:
+            job_ids: Job UUID to record for each defense submission UUID
+            attack_id: Attack submission UUID
+
+        Returns:
+            Open worker IDs for each defense claimed by this call; defenses
+            that were already queued are omitted. Workers whose metadata has
+            expired are dropped as in get_open_workers_for_defense().
+        """
+        with self.client.pipeline(transaction=False) as pipe:
+            for defense_id, job_id in job_ids.items():
+                pipe.set(f"evaluations:queued:{defense_id}:{attack_id}",
+                         str(job_id), nx=True, ex=86400)
+                pipe.smembers(f"workers:open:{defense_id}")
+            results = pipe.execute()
+        return self._live_workers({
+            defense_id: list(workers)
+            for defense_id, claimed, workers in zip(job_ids, results[::2], results[1::2])
+            if claimed
+        })
 
     def lease_gateway_port(self, job_id: str) -> int:
         """Lease an available gateway port from the range 10000-20000."""
         for port in range(10000, 20000):
-            if self.client.setnx(f"gateway:port:{port}", str(job_id)):
-                self.client.expire(f"gateway:port:{port}", 3600)  # 1 hour lease
+            # 1 hour lease, set atomically with the claim
+            if self.client.set(f"gateway:port:{port}", str(job_id), nx=True, ex=3600):
                 return port
         raise RuntimeError("No available gateway ports")
 
@@ -8,22 +8,27 @@ import socket
 import uuid
 import json
 import tempfile
-import zipfile
 import hashlib
 from pathlib import Path
+from urllib.parse import urlsplit
 
 from worker.celery_app import celery_app
 from worker.config import get_config
+from worker.docker_client import get_docker_client
 from worker.db import (
     set_job_status,
     get_defense_submission_source,
-    get_all_validated_defenses,
     get_unevaluated_attacks,
     check_if_needs_validation,
+    mark_defense_validating,
     mark_defense_validated,
     mark_defense_failed,
-    is_evaluation_in_progress,
+    get_validated_defenses_for_attack,
+    get_submission_status,
+    mark_attack_validating,
     mark_attack_validated,
+    mark_attack_evaluating,
+    mark_attack_evaluated,
     get_attack_submission_source,
     insert_attack_files,
     get_active_template,
@@ -34,8 +39,12 @@ from worker.db import (
     find_duplicate_attack_files,
 )
 from worker.redis_client import WorkerRegistry
-from worker.defense.validation import validate_functional, validate_heuristic as validate_defense_heuristic
-from worker.defense.evaluate import evaluate_defense_with_redis, evaluate_defenses_async, ContainerRestartError
+from worker.defense.validation import (
+    get_http_session,
+    validate_functional,
+    validate_heuristic as validate_defense_heuristic,
+)
+from worker.defense.evaluate import evaluate_defenses_async, ContainerRestartError
 from worker.attack.validation import (
     AttackValidationError,
     validate_functional as validate_attack_functional,
@@ -49,6 +58,24 @@ from worker.attack.sandbox.base import SandboxUnavailableError
 logger = get_task_logger(__name__)
 config = get_config()
 
+_READY_PROBE_TIMEOUT = 0.25  # seconds for the TCP connect probe
+_READY_BACKOFF_INITIAL = 0.05  # seconds before the second probe
+_READY_BACKOFF_FACTOR = 1.5  # growth of the delay after every failed probe
+_READY_BACKOFF_MAX = 1.0
+
+
+def _port_accepts_connections(url: str) -> bool:
+    """Return True if a TCP connection to url's host and port succeeds."""
+    parts = urlsplit(url)
+    try:
+        with socket.create_connection(
+            (parts.hostname, parts.port or 80), timeout=_READY_PROBE_TIMEOUT
+        ):
+            return True
+    except OSError:
+        return False
+
+
 def create_eval_network(client, network_name: str, subnet: str):
     """Create evaluation network and clean up overlapping networks if needed."""
     import docker
@@ -90,57 +117,88 @@ def create_eval_network(client, network_name: str, subnet: str):
         raise
 
 
-def _insert_job(
-    job_type: str,
-    status: str,
-    defense_submission_ids: list[str] | None = None,
-    attack_submission_id: str | None = None,
-    user_id: str | None = None
-) -> str:
+def _insert_jobs_bulk(rows: list[dict]) -> list[str]:
     """
-    Insert new job into database and return job_id.
+    Insert new jobs into database with one multi-row INSERT and return their job_ids.
     Helper for enqueueing defense jobs during attack processing.
 
     Args:
-        job_type: 'defense' or 'attack'
-        status: Initial job status ('queued')
-        defense_submission_ids: For defense jobs
-        attack_submission_id: For attack jobs
-        user_id: User who requested the job (optional)
+        rows: One dict per job with 'job_type' ('defense' or 'attack'), the
+            initial 'status' ('queued') and optionally
+            'defense_submission_ids', 'attack_submission_id' and 'user_id'
 
     Returns:
-        Job ID (UUID as string)
+        Job IDs (UUIDs as strings) in the order of rows
     """
     from worker.db import get_engine
     from sqlalchemy import text
 
-    job_id = str(uuid.uuid4())
-    payload = {}
+    if not rows:
+        return []
+
+    job_ids = []
+    values = []
+    params = {}
+    for i, row in enumerate(rows):
+        job_id = str(uuid.uuid4())
+        payload = {}
 
-    if defense_submission_ids:
-        payload['defense_submission_ids'] = defense_submission_ids
-    elif attack_submission_id:
-        payload['attack_submission_id'] = attack_submission_id
-    else:
-        logger.warning(f"Creating job {job_id} of type {job_type} without any submission IDs")
+        if row.get("defense_submission_ids"):
+            payload['defense_submission_ids'] = row["defense_submission_ids"]
+        elif row.get("attack_submission_id"):
+            payload['attack_submission_id'] = row["attack_submission_id"]
+        else:
+            logger.warning(f"Creating job {job_id} of type {row['job_type']} without any submission IDs")
+
+        job_ids.append(job_id)
+        values.append(
+            f"(:id{i}, :job_type{i}, :status{i}, :user_id{i}, CAST(:payload{i} AS jsonb), "
+            "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)"
+        )
+        params.update({
+            f"id{i}": job_id,
+            f"job_type{i}": row["job_type"],
+            f"status{i}": row["status"],
+            f"user_id{i}": row.get("user_id"),
+            f"payload{i}": json.dumps(payload, separators=(',', ':')) if payload else '{}',
+        })
 
     engine = get_engine()
     with engine.begin() as conn:
         conn.execute(
-            text("""
-                INSERT INTO jobs (id, job_type, status, requested_by_user_id, payload, created_at, updated_at)
-                VALUES (:id, :job_type, :status, :user_id, CAST(:payload AS jsonb), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
-            """),
-            {
-                "id": job_id,
-                "job_type": job_type,
-                "status": status,
-                "user_id": user_id,
-                "payload": json.dumps(payload)
-            }
+            text(
+                "INSERT INTO jobs (id, job_type, status, requested_by_user_id, payload, created_at, updated_at) "
+                "VALUES " + ", ".join(values)
+            ),
+            params
         )
 
-    return job_id
+    return job_ids
+
+
+async def _acquire_defense_image(
+    defense_submission_id: str,
+    source_type: str,
+    source_data: dict,
+    config_dict: dict,
+) -> str | None:
+    """Pull or build the image for a defense submission off the event loop."""
+    if source_type == "docker":
+        from worker.defense.docker_handler import pull_and_resolve_docker_image
+        return await asyncio.to_thread(
+            pull_and_resolve_docker_image, source_data["docker_image"]
+        )
+    if source_type == "github":
+        from worker.defense.github_handler import build_from_github_repo
+        return await asyncio.to_thread(
+            build_from_github_repo, source_data["git_repo"], defense_submission_id, config_dict
+        )
+    if source_type == "zip":
+        from worker.defense.zip_handler import build_from_zip_archive
+        return await asyncio.to_thread(
+            build_from_zip_archive, source_data["object_key"], defense_submission_id, config_dict
+        )
+    return None
 
 
 async def _setup_defense_container(
@@ -163,29 +221,12 @@ async def _setup_defense_container(
     import docker
 
     client = docker.from_env()
-    image_name = None
-    gateway_port = None
 
-    try:
-        if source_type == "docker":
-            from worker.defense.docker_handler import pull_and_resolve_docker_image
-            image_name = await asyncio.to_thread(
-                pull_and_resolve_docker_image, source_data["docker_image"]
-            )
-        elif source_type == "github":
-            from worker.defense.github_handler import build_from_github_repo
-            image_name = await asyncio.to_thread(
-                build_from_github_repo, source_data["git_repo"], defense_submission_id, config_dict
-            )
-        elif source_type == "zip":
-            from worker.defense.zip_handler import build_from_zip_archive
-            image_name = await asyncio.to_thread(
-                build_from_zip_archive, source_data["object_key"], defense_submission_id, config_dict
-            )
-    except Exception as e:
-        logger.error(f"Failed to build image for defense {defense_submission_id}: {e}")
-        mark_defense_failed(defense_submission_id, f"Image build failed: {e}")
-        return None
+    # The image pull/build and the network setup are independent, so the
+    # network is prepared while the image is still being fetched or built.
+    image_task = asyncio.create_task(
+        _acquire_defense_image(defense_submission_id, source_type, source_data, config_dict)
+    )
 
     gateway_port = registry.lease_gateway_port(job_id=job_id)
     network_name = f"eval_net_{job_id}_{defense_submission_id[:8]}"
@@ -194,14 +235,44 @@ async def _setup_defense_container(
     y = (port_offset % 32) * 8
     subnet = f"10.50.{x}.{y}/29"
 
+    network = None
+    gateway_container = None
+    network_error = None
     try:
         network = await asyncio.to_thread(create_eval_network, client, network_name, subnet)
         gateway_container = await asyncio.to_thread(client.containers.get, "mlsec-gateway")
         await asyncio.to_thread(network.connect, gateway_container)
     except Exception as e:
-        logger.error(f"Failed to create network for defense {defense_submission_id}: {e}")
-        mark_defense_failed(defense_submission_id, f"Network setup failed: {e}")
+        network_error = e
+
+    async def _remove_network() -> None:
+        # Best effort: the network may exist without the gateway attached.
+        if network is None:
+            return
+        if gateway_container is not None:
+            try:
+                await asyncio.to_thread(network.disconnect, gateway_container, force=True)
+            except Exception:
+                pass
+        try:
+            await asyncio.to_thread(network.remove)
+        except Exception:
+            pass
+
+    try:
+        image_name = await image_task
+    except Exception as e:
+        logger.error(f"Failed to build image for defense {defense_submission_id}: {e}")
+        mark_defense_failed(defense_submission_id, f"Image build failed: {e}")
         registry.release_gateway_port(gateway_port)
+        await _remove_network()
+        return None
+
+    if network_error is not None:
+        logger.error(f"Failed to create network for defense {defense_submission_id}: {network_error}")
+        mark_defense_failed(defense_submission_id, f"Network setup failed: {network_error}")
+        registry.release_gateway_port(gateway_port)
+        await _remove_network()
         return None
 
     container_id = f"{job_id}_{defense_submission_id[:8]}"
@@ -233,11 +304,7 @@ async def _setup_defense_container(
         logger.error(f"Failed to start container for defense {defense_submission_id}: {e}")
         mark_defense_failed(defense_submission_id, f"Container start failed: {e}")
         registry.release_gateway_port(gateway_port)
-        try:
-            await asyncio.to_thread(network.disconnect, gateway_container, force=True)
-            await asyncio.to_thread(network.remove)
-        except Exception:
-            pass
+        await _remove_network()
         return None
 
     await asyncio.to_thread(container.reload)
@@ -290,23 +357,34 @@ async def _validate_defense_container(
     Never raises; an outer try/except catches any unexpected exception so that
     one defense's failure cannot abort the entire batch.
     """
-    import requests
-
     defense_submission_id = ctx["defense_submission_id"]
     container_timeout = config.defense.container.container_timeout
 
     try:
+        # A bare TCP connect through the gateway's DNAT rule is enough to tell
+        # whether the defense is listening yet; only then is one HTTP request
+        # made to confirm the app answers, over the validation session so its
+        # keep-alive connection is reused by the functional checks. Probes
+        # back off exponentially; the first 502 (gateway up, app not yet
+        # answering) is retried straight away.
         start_wait = time.time()
         container_ready = False
+        retried_502 = False
+        delay = _READY_BACKOFF_INITIAL
         while (time.time() - start_wait) < container_timeout:
-            try:
-                res = await asyncio.to_thread(requests.get, ctx["url"], timeout=2)
-                if res.status_code != 502:
-                    container_ready = True
-                    break
-            except Exception:
-                pass
-            await asyncio.sleep(1)
+            if await asyncio.to_thread(_port_accepts_connections, ctx["url"]):
+                try:
+                    res = await asyncio.to_thread(get_http_session().get, ctx["url"], timeout=2)
+                    if res.status_code != 502:
+                        container_ready = True
+                        break
+                    if not retried_502:
+                        retried_502 = True
+                        continue
+                except Exception:
+                    pass
+            await asyncio.sleep(delay)
+            delay = min(delay * _READY_BACKOFF_FACTOR, _READY_BACKOFF_MAX)
 
         if not container_ready:
             logger.error(
@@ -405,6 +483,7 @@ async def _validate_defense_container(
 @celery_app.task(
     name="worker.tasks.run_batch_defense_job",
     bind=True,
+    acks_late=True,
     autoretry_for=(Exception,),
     retry_backoff=True,
     max_retries=3,
@@ -428,15 +507,6 @@ def run_batch_defense_job(
     7. Unregister worker and perform per-defense resource cleanup
     """
     from docker.types import LogConfig
-    import docker
-    from worker.db import (
-        set_job_status,
-        check_if_needs_validation,
-        get_defense_submission_source,
-        get_unevaluated_attacks,
-        mark_defense_validating,
-    )
-    from worker.defense.evaluate import evaluate_defenses_async
 
     log_config = LogConfig(
         type=LogConfig.types.JSON,
@@ -464,26 +534,37 @@ def run_batch_defense_job(
         )
 
         defense_specs: list[tuple[str, bool, str, dict]] = []
-        all_pending_attacks: set[str] = set()
-        
-        for dsid in defense_submission_ids:
-            needs_validation = check_if_needs_validation(dsid)
-            pending_attacks = get_unevaluated_attacks(dsid)
-            
+        # Attacks already pending are handed to the evaluation loop directly
+        # rather than round-tripped through this worker's Redis queue; the
+        # queue only carries attacks distributed while the job is running.
+        all_pending_attacks: dict[str, None] = {}
+
+        # The per-defense lookups are independent, so they run concurrently
+        # in threads; sources are only fetched for defenses that need a container.
+        lookups = await asyncio.gather(*[
+            asyncio.gather(
+                asyncio.to_thread(check_if_needs_validation, dsid),
+                asyncio.to_thread(get_unevaluated_attacks, dsid),
+            )
+            for dsid in defense_submission_ids
+        ])
+
+        active: list[tuple[str, bool]] = []
+        for dsid, (needs_validation, pending_attacks) in zip(defense_submission_ids, lookups):
             if not needs_validation and not pending_attacks:
                 logger.info(f"Skipping container setup for defense {dsid}: already validated and no pending evaluations.")
                 continue
-                
+
+            active.append((dsid, needs_validation))
+            all_pending_attacks.update(dict.fromkeys(pending_attacks))
+
+        sources = await asyncio.gather(*[
+            asyncio.to_thread(get_defense_submission_source, dsid) for dsid, _ in active
+        ])
+        for (dsid, needs_validation), (source_type, source_data) in zip(active, sources):
             if needs_validation:
                 mark_defense_validating(dsid)
-            
-            source_type, source_data = get_defense_submission_source(dsid)
             defense_specs.append((dsid, needs_validation, source_type, source_data))
-            
-            for attack_id in pending_attacks:
-                if attack_id not in all_pending_attacks:
-                    registry.add_attack_to_queue(worker_id, attack_id)
-                    all_pending_attacks.add(attack_id)
 
         if not defense_specs:
             logger.info(f"No defenses in batch job {job_id} require container setup. Finishing job.")
@@ -536,6 +617,7 @@ def run_batch_defense_job(
                 worker_id=worker_id,
                 defense_contexts=valid_contexts,
                 config=config_dict,
+                initial_attacks=list(all_pending_attacks),
             )
 
         set_job_status(job_id=job_id, status="done")
@@ -551,24 +633,31 @@ def run_batch_defense_job(
 
     finally:
         logger.info(f"Cleaning up resources for batch job {job_id}")
-        registry.unregister(worker_id)
-        cleanup_client = docker.from_env()
+        registry.unregister(worker_id, defense_submission_ids)
+        cleanup_client = get_docker_client()
         source_config = config_dict.get("defense", {}).get("build", {})
+        gateway_container = None
+        if defense_contexts:
+            try:
+                gateway_container = cleanup_client.containers.get("mlsec-gateway")
+            except Exception as e:
+                logger.warning(f"Failed to look up gateway container for cleanup: {e}")
         for ctx in defense_contexts:
             try:
-                ctx["container"].stop(timeout=2)
-                ctx["container"].remove()
+                ctx["container"].remove(force=True)
             except Exception as e:
                 logger.debug(f"Failed to remove container for defense {ctx.get('defense_submission_id')}: {e}")
 
             try:
-                ctx["network"].disconnect(cleanup_client.containers.get("mlsec-gateway"), force=True)
+                if gateway_container is not None:
+                    ctx["network"].disconnect(gateway_container, force=True)
                 ctx["network"].remove()
             except Exception as e:
                 logger.warning(f"Failed to remove network for defense {ctx.get('defense_submission_id')}: {e}")
 
             try:
-                gateway_container = cleanup_client.containers.get("mlsec-gateway")
+                if gateway_container is None:
+                    raise RuntimeError("gateway container unavailable")
                 rule_id = f"eval_net_{job_id}_{ctx['defense_submission_id'][:8]}"
                 gateway_container.exec_run(f"iptables -t nat -D PREROUTING -p tcp --dport {ctx['gateway_port']} -m comment --comment {rule_id} -j DNAT --to-destination {ctx['student_ip']}:8080")
                 gateway_container.exec_run(f"iptables -t nat -D POSTROUTING -d {ctx['student_ip']} -p tcp --dport 8080 -m comment --comment {rule_id} -j MASQUERADE")
@@ -684,30 +773,7 @@ def run_attack_job(self, *, job_id: str, attack_submission_id: str) -> None:
        - If no open worker: enqueue new defense job
     """
 
-    from worker.db import (
-        set_job_status,
-        get_attack_submission_source,
-        mark_attack_validating,
-        mark_attack_validated,
-        mark_attack_evaluating,
-        mark_attack_evaluated,
-        mark_attack_failed,
-        insert_attack_files,
-        get_template_reports,
-        get_all_validated_defenses,
-        is_evaluation_in_progress,
-        get_submission_status,
-    )
     from worker.minio_client import get_minio_client, get_bucket_name
-    from worker.attack.validation import (
-        validate_functional as validate_attack_functional,
-        validate_heuristic,
-        _inner_filename,
-        AttackValidationError,
-    )
-    from worker.attack.sandbox import get_sandbox_backend
-    from worker.attack.sandbox.base import SandboxUnavailableError
-    from worker.redis_client import WorkerRegistry
     import shutil
 
     try:
@@ -948,84 +1014,99 @@ def run_attack_job(self, *, job_id: str, attack_submission_id: str) -> None:
                 if os.path.exists(temp_zip.name):
                     os.unlink(temp_zip.name)
                 if temp_extract_dir and os.path.exists(temp_extract_dir):
-                    import shutil
                     shutil.rmtree(temp_extract_dir)
 
-        # Initialize Redis client
-        # Use a temporary worker ID for API-side operations
-        temp_worker_id = f"attack_job_{job_id}"
-        registry = WorkerRegistry()
-
-        # Query all validated defenses (O(n))
-        validated_defenses = get_all_validated_defenses()
+        # Query all validated defenses and which of them already have this
+        # attack queued or running (avoid duplicates), in one query
+        defense_progress = get_validated_defenses_for_attack(attack_submission_id)
+        validated_defenses = list(defense_progress)
         logger.info(f"Found {len(validated_defenses)} validated defenses")
 
-        if validated_defenses:
-            mark_attack_evaluating(attack_submission_id)
+        if not validated_defenses:
+            set_job_status(job_id=job_id, status="done")
+            return
+
+        mark_attack_evaluating(attack_submission_id)
+        registry = WorkerRegistry()
 
         enqueued_count = 0
         new_jobs_count = 0
         remaining_defenses: list[str] = []
 
-        for defense_id in validated_defenses:
-            # Check if evaluation already in progress (avoid duplicates)
-            if is_evaluation_in_progress(defense_id, attack_submission_id):
-                logger.info(
-                    f"Evaluation already in progress for defense {defense_id}, skipping")
-                continue
+        in_progress = {
+            defense_id for defense_id, busy in defense_progress.items() if busy
+        }
+        for defense_id in in_progress:
+            logger.info(
+                f"Evaluation already in progress for defense {defense_id}, skipping")
+
+        # Mark the rest as queued using Redis atomic operations, fetching the
+        # open workers of each defense (per Attack Scenario step 3.ii) in the
+        # same round trip. A placeholder job_id is recorded for tracking.
+        placeholder_job_ids = {
+            defense_id: f"attack-{attack_submission_id}-defense-{defense_id}"
+            for defense_id in validated_defenses
+            if defense_id not in in_progress
+        }
+        claimed = registry.mark_evaluations_queued(placeholder_job_ids, attack_submission_id)
 
-            # Try to mark as queued using Redis atomic operation
-            # Generate a placeholder job_id for tracking
-            placeholder_job_id = f"attack-{attack_submission_id}-defense-{defense_id}"
-            if not registry.mark_evaluation_queued(defense_id, attack_submission_id, placeholder_job_id):
+        target_workers: list[str] = []
+        for defense_id in placeholder_job_ids:
+            if defense_id not in claimed:
                 logger.info(
                     f"Evaluation already marked for defense {defense_id}, skipping")
                 continue
 
-            # Find open workers for this defense (per Attack Scenario step 3.ii)
-            open_workers = registry.get_open_workers_for_defense(defense_id)
-
+            open_workers = claimed[defense_id]
             if open_workers:
                 # Add attack to existing worker's queue
                 worker_id = open_workers[0]  # Use first available worker
-                registry.add_attack_to_queue(worker_id, attack_submission_id)
+                target_workers.append(worker_id)
                 logger.info(
-                    f"Added attack {attack_submission_id} to worker {worker_id} queue")
-                enqueued_count += 1
+                    f"Adding attack {attack_submission_id} to worker {worker_id} queue")
             else:
                 # Collect defenses that need new jobs
                 remaining_defenses.append(defense_id)
                 logger.debug(f"Defense {defense_id} needs a new worker/batch job")
 
+        if target_workers:
+            registry.add_attack_to_queues(target_workers, attack_submission_id)
+            enqueued_count = len(target_workers)
+
         # Batch remaining defenses
         if remaining_defenses:
             batch_size = config.defense.evaluation.batch_size
-            for i in range(0, len(remaining_defenses), batch_size):
-                batch = remaining_defenses[i:i + batch_size]
-                new_job_id = _insert_job(
-                    job_type="defense",
-                    status="queued",
-                    defense_submission_ids=batch
-                )
-
-                run_batch_defense_job.apply_async(
-                    kwargs={
-                        "job_id": new_job_id,
-                        "defense_submission_ids": batch
-                    }
-                )
+            batches = [
+                remaining_defenses[i:i + batch_size]
+                for i in range(0, len(remaining_defenses), batch_size)
+            ]
+            new_job_ids = _insert_jobs_bulk([
+                {"job_type": "defense", "status": "queued", "defense_submission_ids": batch}
+                for batch in batches
+            ])
+            new_jobs = list(zip(new_job_ids, batches))
+
+            # Publish every new job over one broker connection
+            with celery_app.producer_or_acquire() as producer:
+                for new_job_id, batch in new_jobs:
+                    run_batch_defense_job.apply_async(
+                        kwargs={
+                            "job_id": new_job_id,
+                            "defense_submission_ids": batch
+                        },
+                        producer=producer,
+                    )
 
-                logger.info(
-                    f"Enqueued new batch defense job {new_job_id} for defenses {batch}")
-                new_jobs_count += 1
+                    logger.info(
+                        f"Enqueued new batch defense job {new_job_id} for defenses {batch}")
+                    new_jobs_count += 1
 
         logger.info(
             f"Attack job complete: enqueued to {enqueued_count} workers, "
             f"created {new_jobs_count} new defense jobs"
         )
 
-        if validated_defenses:
-            mark_attack_evaluated(attack_submission_id)
+        mark_attack_evaluated(attack_submission_id)
 
         set_job_status(job_id=job_id, status="done")
     except Exception as exc: